@@ -3,14 +3,25 @@ load_dotenv()
 import os
 import streamlit as st
 import pandas as pd
-import json
 import hashlib
+import io
+import uuid
 from datetime import datetime, timedelta
-from utils.csv_parser import load_schedule, get_weekly_task_groups
+from utils.csv_parser import load_schedule, TaskDayIndex, WeeklyTaskGroups
 from utils.openai_helper import (
-    get_task_question, get_notes_summary, refine_task_description, get_daywise_partials
+    get_task_question, refine_task_description,
+    stream_task_question, stream_refined_description, stream_notes_summary
 )
 from utils.docx_handler import fill_report_template
+from utils.bulk_report import build_daily_entries, generate_all_weeks, report_filename
+from utils.task_store import DEFAULT_NAMESPACE, TaskStore
+from utils.prefetch import Prefetcher
+from utils.pipeline import week_task_days, record_answers, generate_partials
+from utils.instrumentation import get_tracer
+from utils.llm_cache import get_cache
+from utils.openai_client import get_scheduler
+from utils.single_flight import get_single_flight
+from utils.assets import AssetCache
 
 st.set_page_config(page_title="Internship Diary Automator", layout="centered")
 st.title("📅 Internship Diary Automator")
@@ -21,7 +32,18 @@ if not OPENAI_API_KEY:
     st.error("OpenAI API key not found in environment variable OPENAI_API_KEY.")
     st.stop()
 
+PARTIALS_MAX_WORKERS = int(os.getenv("PARTIALS_MAX_WORKERS", "8"))
+TEMPLATE_PATH = "templates/Daily Report Template.docx"
+SAVE_REPORTS_DIR = os.getenv("SAVE_REPORTS_DIR", "")
+
 st.sidebar.header("Report Setup")
+workspace = st.sidebar.text_input(
+    "Workspace", value="", placeholder="this schedule",
+    help=(
+        "Task history is kept per workspace. Left empty, every schedule file gets a private one; "
+        f"enter a name to share history across schedules ('{DEFAULT_NAMESPACE}' holds imported history)."
+    ),
+)
 training_mode = st.sidebar.selectbox(
     "Select Training Mode", ["Online", "Physical", "Hybrid"]
 )
@@ -29,46 +51,97 @@ your_signature_file = st.sidebar.file_uploader("Your signature (PNG)", type=["pn
 supervisor_designation = st.sidebar.text_input("Supervisor Designation")
 supervisor_signature_file = st.sidebar.file_uploader("Supervisor signature (PNG)", type=["png"], key="sup_sig")
 
-your_signature_path, supervisor_signature_path = None, None
-if your_signature_file:
-    your_signature_path = f"temp_yoursig_{your_signature_file.name}"
-    with open(your_signature_path, "wb") as f:
-        f.write(your_signature_file.getbuffer())
-if supervisor_signature_file:
-    supervisor_signature_path = f"temp_supsig_{supervisor_signature_file.name}"
-    with open(supervisor_signature_path, "wb") as f:
-        f.write(supervisor_signature_file.getbuffer())
+@st.cache_resource
+def get_asset_cache():
+    # Shared by all sessions; entries are keyed by content hash, so identical uploads are prepared once
+    return AssetCache()
+
+def signature_asset(slot, uploaded_file):
+    """Prepared image bytes for an uploaded signature, releasing this session's previous upload in the slot."""
+    asset_cache = get_asset_cache()
+    session_assets = st.session_state.setdefault("signature_assets", {"session": uuid.uuid4().hex})
+    digest, prepared = None, None
+    if uploaded_file:
+        digest, prepared = asset_cache.put(uploaded_file.getvalue(), session_assets["session"])
+    previous = session_assets.get(slot)
+    if previous and previous != digest:
+        asset_cache.release(previous, session_assets["session"])
+    session_assets[slot] = digest
+    return prepared
+
+your_signature = signature_asset("your", your_signature_file)
+supervisor_signature = signature_asset("supervisor", supervisor_signature_file)
+
+tracer = get_tracer()
+diagnostics = st.sidebar.expander("Diagnostics", expanded=False)
 
 csv_file = st.file_uploader("📄 Upload Task Schedule CSV", type=["csv"])
 
-task_json_path = "task_descriptions.json"
-if os.path.exists(task_json_path):
-    with open(task_json_path, "r") as f:
-        task_json = json.load(f)
-else:
-    task_json = {}
-
-def save_task_json():
-    with open(task_json_path, "w") as f:
-        json.dump(task_json, f, indent=2)
-
-def update_task_history(task_json, task_name, new_full_desc, start_date, end_date):
-    entry = task_json.setdefault(task_name, {"history": [], "daywise_descriptions": {}})
-    found = False
-    for seg in entry["history"]:
-        if seg["description"] == new_full_desc and seg["start"] == start_date and seg["end"] == end_date:
-            found = True
-            break
-    if not found:
-        entry["history"].append({"start": start_date, "end": end_date, "description": new_full_desc})
-    task_json[task_name] = entry
-
-def get_history_for_task(task_name):
-    return task_json.get(task_name, {}).get("history", [])
+@st.cache_resource
+def get_task_store():
+    # One store per process shared by all sessions; migrates task_descriptions.json on first start
+    return TaskStore()
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def load_schedule_cached(csv_hash, _csv_bytes):
+    # Keyed on the content hash only; the leading underscore keeps Streamlit from re-hashing the bytes
+    return load_schedule(io.BytesIO(_csv_bytes))
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def get_task_day_index(csv_hash, _df):
+    # Built once per schedule; read-only afterwards, so sessions can share it
+    return TaskDayIndex(_df)
+
+def get_weekly_task_groups_incremental(csv_hash, df, grouping_anchor, leave_dates):
+    # Per-session grouping that only recomputes the weeks a leave or anchor change touches
+    groups = st.session_state.get("weekly_groups")
+    if groups is None or st.session_state.get("weekly_groups_csv") != csv_hash:
+        groups = WeeklyTaskGroups(get_task_day_index(csv_hash, df))
+        st.session_state["weekly_groups"] = groups
+        st.session_state["weekly_groups_csv"] = csv_hash
+    with tracer.stage("grouping.update"):
+        return groups.update(grouping_anchor, leave_dates)
+
+def write_stream_with_prefix(prefix, chunks):
+    """Renders streamed chunks after prefix as they arrive and returns the stripped text without it."""
+    def prefixed():
+        yield prefix
+        yield from chunks
+    return st.write_stream(prefixed())[len(prefix):].strip()
+
+def get_refined_text(raw_text, show=False):
+    """
+    Refines raw_text once per distinct content: results live in st.session_state keyed by
+    the text's hash, so reruns with unchanged text never hit the API again.
+    With show=True the refinement is displayed, streamed token by token when it is new.
+    """
+    text_key = hashlib.sha256(raw_text.encode("utf-8")).hexdigest()
+    refinements = st.session_state.setdefault("refinements", {})
+    if text_key in refinements:
+        if show:
+            st.info("**AI-refined:** " + refinements[text_key])
+    elif show:
+        # Stream into the same st.info box later reruns show, so the answer doesn't change style once done
+        box = st.empty()
+        box.info("**AI-refined:** …")
+        text = ""
+        for chunk in stream_refined_description(raw_text, OPENAI_API_KEY):
+            text += chunk
+            box.info("**AI-refined:** " + text)
+        refinements[text_key] = text.strip()
+        box.info("**AI-refined:** " + refinements[text_key])
+    else:
+        with st.spinner("AI is refining your answer..."):
+            refinements[text_key] = refine_task_description(raw_text, OPENAI_API_KEY)
+    return refinements[text_key]
 
 if csv_file:
     try:
-        df = load_schedule(csv_file)
+        csv_bytes = csv_file.getvalue()
+        csv_hash = hashlib.sha256(csv_bytes).hexdigest()
+        df = load_schedule_cached(csv_hash, csv_bytes)
+        # History is private to this schedule file unless the user names a shared workspace
+        task_store = get_task_store().for_namespace(workspace.strip() or f"schedule-{csv_hash[:16]}")
         st.success("✅ CSV successfully parsed!")
         st.subheader("🔍 Task Preview")
         st.dataframe(df.head(10), use_container_width=True)
@@ -90,15 +163,11 @@ if csv_file:
             if leave_day:
                 leave_dates.append(leave_day)
                 leave_data[leave_day] = leave_reason
+        leave_dates = frozenset(leave_dates)
 
         st.subheader("📆 Weekly Grouping")
         grouping_anchor = min(start_date_input, csv_earliest_start)
-        weekly_tasks = get_weekly_task_groups(
-            df,
-            grouping_anchor=grouping_anchor,
-            exclude_weekends=True,
-            leave_dates=leave_dates
-        )
+        weekly_tasks = get_weekly_task_groups_incremental(csv_hash, df, grouping_anchor, leave_dates)
         week_labels = sorted(list(weekly_tasks.keys()))
 
         if week_labels:
@@ -109,15 +178,8 @@ if csv_file:
 
                 week_start = datetime.strptime(selected_week.split(" to ")[0], "%Y-%m-%d").date()
                 week_ending = (week_start + timedelta(days=6)).strftime('%Y-%m-%d')
-                days_of_week = ["MONDAY", "TUESDAY", "WEDNESDAY", "THURSDAY", "FRIDAY", "SATURDAY", "SUNDAY"]
 
-                unique_tasks = {}
-                for i in range(7):
-                    day = week_start + timedelta(days=i)
-                    if day in leave_dates:
-                        continue
-                    for task in tasks.get(day, []):
-                        unique_tasks.setdefault(task, []).append(day.strftime('%Y-%m-%d'))
+                unique_tasks = week_task_days(tasks, week_start, leave_dates)
 
                 # --- CHAT Q&A, AI-refine and show immediately ---
                 if 'chat_task_list' not in st.session_state or st.session_state.get('chat_week') != selected_week:
@@ -134,23 +196,33 @@ if csv_file:
                 answers = st.session_state['chat_answers']
                 questions = st.session_state['chat_questions']
 
+                # Generate the remaining questions in the background, a few at a time; a week change drops the old jobs
+                if "question_prefetcher" not in st.session_state:
+                    st.session_state["question_prefetcher"] = Prefetcher(get_task_question)
+                prefetcher = st.session_state["question_prefetcher"]
+                prefetcher.prefetch(selected_week, [t for t in task_list if t not in questions], OPENAI_API_KEY)
+                questions.update(prefetcher.pop_ready(selected_week))
+
                 if idx < len(task_list):
                     current_task = task_list[idx]
                     current_task_key = hashlib.md5(f"{current_task}_{selected_week}".encode()).hexdigest()
-                    if current_task not in questions:
+                    if current_task not in questions and prefetcher.is_pending(selected_week, current_task):
                         with st.spinner("AI is thinking..."):
-                            q = get_task_question(current_task, OPENAI_API_KEY)
+                            q = prefetcher.wait_for(selected_week, current_task)
+                        if q:
+                            questions[current_task] = q
+                    if current_task not in questions:
+                        q = write_stream_with_prefix("**AI:** ", stream_task_question(current_task, OPENAI_API_KEY))
                         questions[current_task] = q
                         st.session_state['chat_questions'] = questions
-
-                    st.markdown(f"**AI:** {questions[current_task]}")
+                    else:
+                        st.markdown(f"**AI:** {questions[current_task]}")
                     user_answer = st.text_area(
                         "Your answer:",
                         key=f"answer_{current_task_key}"
                     )
                     if user_answer:
-                        refined_answer = refine_task_description(user_answer, OPENAI_API_KEY)
-                        st.info("**AI-refined:** " + refined_answer)
+                        refined_answer = get_refined_text(user_answer, show=True)
                         if st.button("Use this answer and continue", key=f"use_{current_task_key}"):
                             answers[current_task] = refined_answer
                             st.session_state['chat_answers'] = answers
@@ -168,37 +240,21 @@ if csv_file:
                             key=f"review_{unique_task_key}"
                         )
                         if st.button(f"Refine {task}", key=f"refine_{unique_task_key}"):
-                            new_answer = refine_task_description(new_answer, OPENAI_API_KEY)
+                            new_answer = get_refined_text(new_answer)
                         st.session_state['chat_answers'][task] = new_answer
 
-                    # Save/extend task history and create partials for each day
-                    for task, days in unique_tasks.items():
-                        full_desc = st.session_state['chat_answers'].get(task, "")
-                        if not full_desc:
-                            continue
-                        start_date = days[0]
-                        end_date = days[-1]
-                        entry = task_json.setdefault(task, {"history": [], "daywise_descriptions": {}})
-                        # Only append if new segment (i.e., if description or date range changed)
-                        need_new = True
-                        for seg in entry["history"]:
-                            if seg["start"] == start_date and seg["end"] == end_date and seg["description"] == full_desc:
-                                need_new = False
-                                break
-                        if need_new:
-                            entry["history"].append({"start": start_date, "end": end_date, "description": full_desc})
-                        # Now make sure daywise_partials exist for all days
-                        missing_days = [d for d in days if d not in entry["daywise_descriptions"]]
-                        if missing_days:
-                            partials = get_daywise_partials(entry["history"], missing_days, OPENAI_API_KEY)
-                            for d in missing_days:
-                                entry["daywise_descriptions"][d] = partials[d]
-                        task_json[task] = entry
-                    save_task_json()
+                    # Save/extend task history and collect days still needing partials
+                    partial_requests = record_answers(task_store, unique_tasks, st.session_state['chat_answers'])
+                    # Generate every task's missing days at once, one batched request per task
+                    if partial_requests:
+                        with st.spinner("Writing day-wise entries..."):
+                            generate_partials(
+                                task_store, partial_requests, OPENAI_API_KEY, max_workers=PARTIALS_MAX_WORKERS
+                            )
 
                     # --- Show days spanned, days left ---
                     for task in task_list:
-                        all_days = sorted(set(task_json.get(task, {}).get("daywise_descriptions", {}).keys()))
+                        all_days = sorted(task_store.get_daywise(task).keys())
                         week_days = unique_tasks[task]
                         new_days = [d for d in week_days if d not in all_days]
                         done_days = [d for d in week_days if d in all_days]
@@ -219,7 +275,7 @@ if csv_file:
                             all_entries = "\n".join([
                                 f"{task}: {ans}" for task, ans in st.session_state['chat_answers'].items()
                             ])
-                            summary = get_notes_summary(all_entries, OPENAI_API_KEY)
+                            summary = write_stream_with_prefix("", stream_notes_summary(all_entries, OPENAI_API_KEY))
                             st.session_state["auto_details_notes"] = summary
                             st.session_state["auto_notes_week"] = selected_week
 
@@ -228,53 +284,88 @@ if csv_file:
                         value=st.session_state.get("auto_details_notes", ""),
                         key="details_notes"
                     )
+                    st.session_state.setdefault("weekly_notes", {})[selected_week] = details_notes
 
                     st.info("Your edits are saved live. You can now generate and download your weekly report.")
 
                     if st.button("Generate Weekly Report"):
-                        template_path = "templates/Daily Report Template.docx"
-                        week_label = selected_week
-                        output_dir = "outputs"
-                        if not os.path.exists(output_dir):
-                            os.makedirs(output_dir)
-                        output_filename = f"Diary_{week_label.replace(' ', '').replace(':', '-')}.docx"
-                        output_path = os.path.join(output_dir, output_filename)
-
-                        daily_entries = {}
-                        for i, day_name in enumerate(days_of_week):
-                            d = week_start + timedelta(days=i)
-                            date_str = d.strftime('%Y-%m-%d')
-                            desc = ""
-                            if d in leave_dates:
-                                desc = f"Leave taken — {leave_data.get(d, 'No reason provided')}"
-                            else:
-                                day_tasks = tasks.get(d, [])
-                                parts = []
-                                for task in day_tasks:
-                                    daywise = task_json.get(task, {}).get("daywise_descriptions", {})
-                                    partial = daywise.get(date_str, "")
-                                    if partial:
-                                        parts.append(f"{task}:\n{partial}")
-                                desc = "\n\n".join(parts)
-                            daily_entries[day_name] = {"date": date_str, "desc": desc}
-
-                        fill_report_template(
-                            template_path,
+                        output_filename = report_filename(selected_week)
+                        # Rendered in memory; set SAVE_REPORTS_DIR to also keep a copy on disk
+                        output_path = None
+                        if SAVE_REPORTS_DIR:
+                            os.makedirs(SAVE_REPORTS_DIR, exist_ok=True)
+                            output_path = os.path.join(SAVE_REPORTS_DIR, output_filename)
+
+                        daywise_by_task = {task: task_store.get_daywise(task) for task in unique_tasks}
+                        daily_entries = build_daily_entries(week_start, tasks, daywise_by_task, leave_data)
+
+                        report = fill_report_template(
+                            TEMPLATE_PATH,
                             output_path,
                             week_ending=week_ending,
                             training_mode=training_mode,
                             daily_entries=daily_entries,
                             details_notes=details_notes,
-                            your_signature_path=your_signature_path,
-                            supervisor_signature_path=supervisor_signature_path,
+                            your_signature_path=your_signature,
+                            supervisor_signature_path=supervisor_signature,
                             supervisor_designation=supervisor_designation
                         )
-                        with open(output_path, "rb") as f:
-                            st.success("Your weekly report is ready!")
-                            st.download_button("Download Report", f, file_name=output_filename)
+                        st.success("Your weekly report is ready!")
+                        st.download_button("Download Report", report, file_name=output_filename)
+
+            st.subheader("📦 All Weeks")
+            if st.button("Generate reports for all weeks"):
+                all_tasks = {task for week in weekly_tasks.values() for day_tasks in week.values() for task in day_tasks}
+                with st.spinner("Rendering weekly reports..."):
+                    zip_bytes, builds, rendered = generate_all_weeks(
+                        weekly_tasks,
+                        {task: task_store.get_daywise(task) for task in all_tasks},
+                        leave_data,
+                        TEMPLATE_PATH,
+                        training_mode,
+                        details_by_week=st.session_state.get("weekly_notes", {}),
+                        your_signature_path=your_signature,
+                        supervisor_signature_path=supervisor_signature,
+                        supervisor_designation=supervisor_designation,
+                        previous_builds=st.session_state.get("bulk_builds"),
+                    )
+                st.session_state["bulk_builds"] = builds
+                st.success(f"Built {len(builds)} weekly reports ({len(rendered)} re-rendered, {len(builds) - len(rendered)} unchanged).")
+                st.download_button("Download all reports (ZIP)", zip_bytes, file_name="Internship_Diary.zip", mime="application/zip")
         else:
             st.warning("⚠️ No weeks found in your task data range.")
     except Exception as e:
         st.error(f"❌ Failed to parse CSV: {e}")
 else:
     st.warning("📂 Please upload a CSV file to proceed.")
+
+# --- Diagnostics (filled last so it includes this rerun) ---
+with diagnostics:
+    if tracer.enabled:
+        st.caption("Server-wide: timings and token usage from every session since the server started.")
+        stages = tracer.stage_summary()
+        if stages:
+            st.caption("Stage timings")
+            st.dataframe(
+                pd.DataFrame.from_dict(stages, orient="index")[["count", "mean_s", "max_s", "total_s", "errors"]],
+                use_container_width=True,
+            )
+        llm = tracer.llm_summary()
+        st.caption(
+            f"LLM calls: {llm['calls']} ({llm['cache_hits']} from cache, {llm['shared']} shared in flight) — "
+            f"tokens: {llm['prompt_tokens']} prompt + {llm['completion_tokens']} completion"
+        )
+        recent = [e for e in tracer.recent_events(20) if e["type"] == "llm"]
+        if recent:
+            st.dataframe(
+                pd.DataFrame(recent)[["call", "seconds", "cache", "prompt_tokens", "completion_tokens"]],
+                use_container_width=True,
+            )
+        st.caption(f"Trace file: {tracer.path}")
+    else:
+        st.caption("Start the server with DIARY_TRACE=1 to collect per-stage timings and token usage.")
+    cache_stats = get_cache().stats()
+    st.caption(f"Response cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses")
+    st.caption("Scheduler: " + ", ".join(f"{k}={v if isinstance(v, int) else round(v, 2)}" for k, v in get_scheduler().metrics().items()))
+    flights = get_single_flight().metrics()
+    st.caption(f"Coalesced requests: {flights['shared']} saved of {flights['calls']} ({flights['in_flight']} in flight)")
@@ -0,0 +1,35 @@
+"""
+Scaling benchmark for utils.csv_parser.get_weekly_task_groups.
+
+Times the grouping over synthetic schedules of doubling size and reports the cost per
+(row + expanded day). A roughly constant per-unit cost means the engine scales linearly.
+
+    python benchmarks/bench_grouping.py
+"""
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import make_schedule
+from utils.csv_parser import get_weekly_task_groups
+
+
+def main():
+    leave_dates = [date(2025, 2, 3) + timedelta(days=7 * i) for i in range(10)]
+    print(f"{'rows':>8} {'days':>9} {'seconds':>9} {'us/unit':>8}")
+    for rows in [1_000, 2_000, 4_000, 8_000, 16_000, 32_000]:
+        df = make_schedule(rows)
+        expanded = int(((df["Due Date"] - df["Start Date"]).dt.days + 1).sum())
+        best = float("inf")
+        for _ in range(3):
+            t0 = time.perf_counter()
+            get_weekly_task_groups(df, leave_dates=leave_dates)
+            best = min(best, time.perf_counter() - t0)
+        print(f"{rows:>8} {expanded:>9} {best:>9.4f} {best / (rows + expanded) * 1e6:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
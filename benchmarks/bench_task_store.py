@@ -0,0 +1,175 @@
+"""
+Load test for utils.task_store: N parallel sessions, each in its own namespace, record a
+history segment and five day-wise descriptions per task per week, and read them back as
+the app does. Afterwards every namespace is checked for lost updates.
+
+    python benchmarks/bench_task_store.py
+    python benchmarks/bench_task_store.py --processes --sessions 1 4 16
+    python benchmarks/bench_task_store.py --same-namespace
+
+--same-namespace puts every session in one namespace, each with its own set of task names, so
+sessions share the namespace's task rows and its cached reads.
+
+For comparison, --json runs the same workload against the old layout (one shared JSON file
+loaded and rewritten whole by every session), which loses updates as soon as sessions overlap.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.task_store import TaskStore
+
+DAYS = 5
+
+
+def _week_days(week):
+    monday = date(2025, 1, 6) + timedelta(days=7 * week)
+    return [(monday + timedelta(days=i)).isoformat() for i in range(DAYS)]
+
+
+def _layout(session, tasks, same_namespace):
+    """(namespace, task names) for one session: its own namespace, or a disjoint task set in a shared one."""
+    if same_namespace:
+        return "shared", [f"Task {session}-{t}" for t in range(tasks)]
+    return f"session-{session}", [f"Task {t}" for t in range(tasks)]
+
+
+def run_session(store, task_names, weeks):
+    """One session's workload; returns the number of store operations it made."""
+    ops = 0
+    for week in range(weeks):
+        days = _week_days(week)
+        for task in task_names:
+            store.add_history_segment(task, days[0], days[-1], f"Worked on {task} in week {week}.")
+            daywise = store.get_daywise(task)
+            store.set_daywise(task, {day: f"{task} on {day}" for day in days if day not in daywise})
+            store.get_history(task, days[0], days[-1])
+            ops += 4
+    return ops
+
+
+def _process_session(path, namespace, task_names, weeks):
+    return run_session(TaskStore(path, legacy_json_path=None, namespace=namespace), task_names, weeks)
+
+
+def lost_updates(store, layouts, weeks):
+    """Day-wise entries and history segments missing from any session's tasks after the run."""
+    missing = 0
+    for namespace, task_names in layouts:
+        view = store.for_namespace(namespace)
+        for task in task_names:
+            missing += DAYS * weeks - len(view.get_daywise(task))
+            covered = {seg["start"] for seg in view.get_history(task)}
+            missing += sum(_week_days(week)[0] not in covered for week in range(weeks))
+    return missing
+
+
+def bench_sqlite(sessions, tasks, weeks, processes, same_namespace=False):
+    layouts = [_layout(s, tasks, same_namespace) for s in range(sessions)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tasks.sqlite3")
+        store = TaskStore(path, legacy_json_path=None)
+        t0 = time.perf_counter()
+        if processes:
+            with ProcessPoolExecutor(max_workers=sessions) as pool:
+                ops = sum(pool.map(
+                    _process_session, [path] * sessions, [namespace for namespace, _ in layouts],
+                    [task_names for _, task_names in layouts], [weeks] * sessions,
+                ))
+        else:
+            with ThreadPoolExecutor(max_workers=sessions) as pool:
+                ops = sum(pool.map(
+                    lambda layout: run_session(store.for_namespace(layout[0]), layout[1], weeks), layouts
+                ))
+        seconds = time.perf_counter() - t0
+        return ops, seconds, lost_updates(store, layouts, weeks)
+
+
+class JsonFileStore:
+    """The pre-SQLite behaviour: load the whole file, change one task, write the whole file back."""
+
+    def __init__(self, path, namespace):
+        self.path = path
+        self.namespace = namespace
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, data):
+        with open(self.path, "w") as f:
+            json.dump(data, f)
+
+    def _entry(self, data, task):
+        return data.setdefault(f"{self.namespace}/{task}", {"history": [], "daywise_descriptions": {}})
+
+    def add_history_segment(self, task, start, end, description):
+        data = self._load()
+        self._entry(data, task)["history"].append({"start": start, "end": end, "description": description})
+        self._save(data)
+
+    def get_history(self, task, start=None, end=None):
+        return self._entry(self._load(), task)["history"]
+
+    def get_daywise(self, task):
+        return dict(self._entry(self._load(), task)["daywise_descriptions"])
+
+    def set_daywise(self, task, partials):
+        data = self._load()
+        self._entry(data, task)["daywise_descriptions"].update(partials)
+        self._save(data)
+
+
+def bench_json(sessions, tasks, weeks):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "task_descriptions.json")
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=sessions) as pool:
+            ops = sum(pool.map(
+                lambda s: run_session(JsonFileStore(path, f"session-{s}"), [f"Task {t}" for t in range(tasks)], weeks),
+                range(sessions),
+            ))
+        seconds = time.perf_counter() - t0
+        missing = 0
+        for s in range(sessions):
+            view = JsonFileStore(path, f"session-{s}")
+            missing += sum(DAYS * weeks - len(view.get_daywise(f"Task {t}")) for t in range(tasks))
+        return ops, seconds, missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--tasks", type=int, default=10)
+    parser.add_argument("--weeks", type=int, default=8)
+    parser.add_argument("--processes", action="store_true", help="one process per session instead of threads")
+    parser.add_argument("--same-namespace", action="store_true", help="all sessions in one namespace, disjoint tasks")
+    parser.add_argument("--json", action="store_true", help="also run the legacy shared-JSON store")
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'store':<8} {'sessions':>8} {'ops':>7} {'seconds':>8} {'ops/s':>9} {'lost':>6}")
+    for sessions in args.sessions:
+        ops, seconds, lost = bench_sqlite(sessions, args.tasks, args.weeks, args.processes, args.same_namespace)
+        failed |= lost > 0
+        print(f"{'sqlite':<8} {sessions:>8} {ops:>7} {seconds:>8.3f} {ops / seconds:>9.0f} {lost:>6}")
+        if args.json:
+            ops, seconds, lost = bench_json(sessions, args.tasks, args.weeks)
+            print(f"{'json':<8} {sessions:>8} {ops:>7} {seconds:>8.3f} {ops / seconds:>9.0f} {lost:>6}")
+    if failed:
+        print("Lost updates in the SQLite store")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
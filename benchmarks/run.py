@@ -0,0 +1,252 @@
+"""
+Benchmark suite: CSV ingestion, week grouping, report rendering and the LLM fan-out
+(against benchmarks/mock_openai.py, so no network or API key is needed).
+
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --quick --baseline results.json
+
+Results are written as JSON. With --baseline, each benchmark is compared against the stored
+run and the script exits non-zero if any is slower by more than --threshold.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_openai import MockOpenAIServer
+from benchmarks.synthetic import make_leave_dates, make_schedule, write_schedule_csv
+from utils.csv_parser import TaskDayIndex, WeeklyTaskGroups, get_weekly_task_groups, load_schedule
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "templates", "Daily Report Template.docx")
+
+
+def measure(fn, repeat):
+    fn()  # warm-up
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - t0)
+    return {"best": min(timings), "median": statistics.median(timings), "runs": repeat}
+
+
+def bench_ingestion(results, rows, repeat):
+    df = make_schedule(rows)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "schedule.csv")
+        write_schedule_csv(df, path, extra_columns=20)
+        with open(path, "rb") as f:
+            data = f.read()
+    results[f"load_schedule/full/{rows}"] = measure(lambda: load_schedule(io.BytesIO(data), fast=False), repeat)
+    results[f"load_schedule/fast/{rows}"] = measure(lambda: load_schedule(io.BytesIO(data)), repeat)
+
+
+def bench_grouping(results, rows, repeat):
+    df = make_schedule(rows)
+    leave_dates = make_leave_dates(10)
+    results[f"get_weekly_task_groups/{rows}"] = measure(
+        lambda: get_weekly_task_groups(df, leave_dates=leave_dates), repeat
+    )
+
+    # One leave day toggled on an already-grouped schedule
+    groups = WeeklyTaskGroups(TaskDayIndex(df))
+    groups.update(leave_dates=leave_dates)
+    toggled = leave_dates[1:]
+    results[f"get_weekly_task_groups/incremental_leave/{rows}"] = measure(
+        lambda: (groups.update(leave_dates=toggled), groups.update(leave_dates=leave_dates)), repeat
+    )
+
+
+def bench_render(results, repeat):
+    from utils.docx_handler import fill_report_template
+
+    daily_entries = {
+        day: {"date": "2025-01-06", "desc": "Task A:\nDid some work.\n\nTask B:\nDid more work."}
+        for day in ["MONDAY", "TUESDAY", "WEDNESDAY", "THURSDAY", "FRIDAY"]
+    }
+    results["fill_report_template"] = measure(
+        lambda: fill_report_template(
+            TEMPLATE_PATH, None, week_ending="2025-01-12", training_mode="Online",
+            daily_entries=daily_entries, details_notes="Weekly notes.", supervisor_designation="Engineer",
+        ),
+        repeat,
+    )
+
+
+def bench_llm(results, latency, rate_limit, repeat, tasks=8, days=5):
+    from utils.llm_cache import LLMCache, set_cache
+    from utils.openai_client import RequestScheduler, get_scheduler, set_scheduler
+    from utils.openai_helper import get_daywise_partials, get_week_partials
+
+    server = MockOpenAIServer(("127.0.0.1", 0), latency=latency, rate_limit=rate_limit).start()
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    api_key = f"mock-{server.server_address[1]}"
+    tmp = tempfile.TemporaryDirectory()
+    # Sampled calls are not cached by default, so every run really reaches the mock server
+    set_cache(LLMCache(path=os.path.join(tmp.name, "cache.sqlite3")))
+    set_scheduler(RequestScheduler(backoff_multiplier=0.05, backoff_max=1))
+
+    descs = [{"start": "2025-01-06", "end": "2025-01-10", "description": "Built and tested the report exporter."}]
+    all_days = [f"2025-01-{d:02d}" for d in range(6, 6 + days)]
+    # Distinct descriptions give distinct prompts; identical ones would be coalesced into one request
+    week = {
+        f"Task {i}": ([dict(descs[0], description=f"Built and tested part {i} of the report exporter.")], all_days)
+        for i in range(tasks)
+    }
+    suffix = f"latency={latency},429={rate_limit}"
+    try:
+        results[f"daywise_partials/per_day/{suffix}"] = measure(
+            lambda: get_daywise_partials(descs, all_days, api_key), repeat
+        )
+        results[f"daywise_partials/batched/{suffix}"] = measure(
+            lambda: get_daywise_partials(descs, all_days, api_key, batched=True), repeat
+        )
+        results[f"review_stage/sequential/{suffix}"] = measure(
+            lambda: get_week_partials(week, api_key, max_workers=1, batched=False), repeat
+        )
+        before = dict(server.stats)
+        results[f"review_stage/concurrent/{suffix}"] = measure(
+            lambda: get_week_partials(week, api_key, max_workers=tasks, batched=True), repeat
+        )
+        results[f"review_stage/concurrent/{suffix}"]["scheduler"] = get_scheduler().metrics()
+        results[f"review_stage/concurrent/{suffix}"]["server"] = {
+            name: value - before[name] for name, value in server.stats.items()
+        }
+    finally:
+        server.shutdown()
+        server.server_close()
+        tmp.cleanup()
+        os.environ.pop("OPENAI_BASE_URL", None)
+
+
+def bench_burst(results, latency, students, repeat, distinct_tasks=3):
+    """A class opening the same shared schedule at once: every student asks for a question."""
+    from utils.llm_cache import LLMCache, set_cache
+    from utils.openai_client import RequestScheduler, set_scheduler
+    from utils.openai_helper import get_task_question
+    from utils.single_flight import SingleFlight, get_single_flight, set_single_flight
+
+    server = MockOpenAIServer(("127.0.0.1", 0), latency=latency).start()
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    api_key = f"mock-{server.server_address[1]}"
+    tmp = tempfile.TemporaryDirectory()
+    set_cache(LLMCache(path=os.path.join(tmp.name, "cache.sqlite3")))
+    set_scheduler(RequestScheduler(requests_per_minute=100_000, tokens_per_minute=100_000_000))
+
+    def burst():
+        barrier = threading.Barrier(students)
+
+        def student(i):
+            barrier.wait()
+            return get_task_question(f"Task {i % distinct_tasks}", api_key)
+
+        with ThreadPoolExecutor(max_workers=students) as pool:
+            list(pool.map(student, range(students)))
+
+    try:
+        # A zero timeout sends every waiter straight to its own request, i.e. no coalescing
+        for name, timeout in [("uncoalesced", 0), ("single_flight", 60)]:
+            set_single_flight(SingleFlight(timeout=timeout))
+            requests_before = server.stats["requests"]
+            result = measure(burst, repeat)
+            result["single_flight"] = get_single_flight().metrics()
+            result["api_requests_per_burst"] = (server.stats["requests"] - requests_before) / (repeat + 1)
+            results[f"burst/{name}/students={students}"] = result
+    finally:
+        set_single_flight(SingleFlight())
+        server.shutdown()
+        server.server_close()
+        tmp.cleanup()
+        os.environ.pop("OPENAI_BASE_URL", None)
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    print(f"\n{'benchmark':<55} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for name, current in sorted(results.items()):
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        ratio = current["best"] / previous["best"] if previous["best"] else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<55} {previous['best']:>10.4f} {current['best']:>10.4f} {ratio:>7.2f}{flag}")
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quick", action="store_true", help="smaller inputs and fewer repeats")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", help="results JSON from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown before flagging (0.2 = 20%%)")
+    parser.add_argument("--latency", type=float, default=0.2, help="mock API latency in seconds")
+    parser.add_argument("--rate-limit", type=float, default=0.1, help="mock API 429 probability")
+    parser.add_argument("--students", type=int, default=30, help="concurrent sessions in the burst benchmark")
+    parser.add_argument("--skip-llm", action="store_true")
+    args = parser.parse_args()
+
+    repeat = 3 if args.quick else 7
+    sizes = [5_000] if args.quick else [5_000, 50_000]
+    results = {}
+    for rows in sizes:
+        bench_ingestion(results, rows, repeat)
+        bench_grouping(results, rows, repeat)
+    bench_render(results, repeat * 5)
+    if not args.skip_llm:
+        bench_llm(results, args.latency, 0.0, min(repeat, 3))
+        if args.rate_limit:
+            bench_llm(results, args.latency, args.rate_limit, min(repeat, 3))
+        bench_burst(results, args.latency, args.students, min(repeat, 3))
+
+    for name, result in sorted(results.items()):
+        line = f"{name:<55} best {result['best']:.4f}s  median {result['median']:.4f}s"
+        if "api_requests_per_burst" in result:
+            line += f"  api requests/burst {result['api_requests_per_burst']:.1f}"
+        print(line)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": args.quick,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) slower than baseline by more than {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
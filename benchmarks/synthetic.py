@@ -0,0 +1,75 @@
+"""
+Synthetic task schedules for benchmarks.
+
+    python benchmarks/synthetic.py --rows 5000 --span-days 180 --out schedule.csv
+"""
+import argparse
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+
+def make_schedule(rows, span_days=180, max_task_days=10, overlap=1.0, distinct_tasks=200,
+                  linked_ratio=0.5, start=date(2025, 1, 6), seed=0):
+    """
+    rows: number of task rows
+    span_days: calendar days over which task start dates are spread
+    max_task_days: longest task duration; durations are uniform in [1, max_task_days]
+    overlap: scales durations, so >1 means more tasks running on the same day
+    distinct_tasks: number of distinct task names (names repeat across rows)
+    linked_ratio: share of rows with a Linked Entity
+    """
+    rng = np.random.default_rng(seed)
+    base = pd.Timestamp(start)
+    durations = np.maximum(0, np.round(rng.integers(0, max_task_days, rows) * overlap)).astype(int)
+    starts = base + pd.to_timedelta(rng.integers(0, span_days, rows), unit="D")
+    dues = starts + pd.to_timedelta(durations, unit="D")
+    return pd.DataFrame({
+        "Task Name": [f"Task {i % distinct_tasks}" for i in range(rows)],
+        "Start Date": starts,
+        "Due Date": dues,
+        "Assignee": "Intern",
+        "Linked Entity": np.where(rng.random(rows) < linked_ratio, "PROJ", None),
+    })
+
+
+def make_leave_dates(count, span_days=180, start=date(2025, 1, 6), seed=0):
+    """count distinct weekday leave dates within the schedule span."""
+    rng = np.random.default_rng(seed + 1)
+    weekdays = [start + timedelta(days=d) for d in range(span_days) if (start + timedelta(days=d)).weekday() < 5]
+    picks = rng.choice(len(weekdays), size=min(count, len(weekdays)), replace=False)
+    return sorted(weekdays[i] for i in picks)
+
+
+def write_schedule_csv(df, path, date_format="%Y-%m-%d", extra_columns=0):
+    """Writes df the way project tools export it, optionally padded with unused columns."""
+    out = df.copy()
+    out["Start Date"] = out["Start Date"].dt.strftime(date_format)
+    out["Due Date"] = out["Due Date"].dt.strftime(date_format)
+    for i in range(extra_columns):
+        out[f"Custom Field {i}"] = np.arange(len(out))
+    out.to_csv(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--span-days", type=int, default=180)
+    parser.add_argument("--max-task-days", type=int, default=10)
+    parser.add_argument("--overlap", type=float, default=1.0)
+    parser.add_argument("--leave-days", type=int, default=0)
+    parser.add_argument("--extra-columns", type=int, default=0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    df = make_schedule(args.rows, args.span_days, args.max_task_days, args.overlap, seed=args.seed)
+    write_schedule_csv(df, args.out, extra_columns=args.extra_columns)
+    if args.leave_days:
+        for day in make_leave_dates(args.leave_days, args.span_days, seed=args.seed):
+            print(day.isoformat())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Generates weekly diary reports without the Streamlit UI.
+
+    python cli.py --schedule schedule.csv --answers answers.json --out reports/
+    python cli.py --schedule schedule.csv --leave leave.csv --answers answers.json \\
+        --weeks 2025-01-06:2025-03-31 --workers 8 --out reports/
+
+answers.json:
+    {"tasks": {"<task name>": "what you did"},
+     "weeks": {"2025-01-06 to 2025-01-12": {"<task name>": "answer for that week only"}},
+     "notes": {"2025-01-06 to 2025-01-12": "weekly notes"}}
+
+leave.csv: one 'YYYY-MM-DD,reason' row per leave day.
+
+Progress is kept in <out>/progress.json (override with --progress), so rerunning the same
+command only renders weeks whose inputs changed or whose report is missing.
+"""
+import argparse
+import os
+import sys
+from datetime import date
+
+from dotenv import load_dotenv
+
+from utils.pipeline import run_batch
+from utils.task_store import DEFAULT_DB_PATH, DEFAULT_NAMESPACE, TaskStore
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates", "Daily Report Template.docx")
+
+
+def parse_week_range(value):
+    """'FIRST:LAST' with either side optional, e.g. '2025-01-06:', ':2025-03-31' or a single date."""
+    first, _, last = value.partition(":") if ":" in value else (value, ":", value)
+    try:
+        return (
+            date.fromisoformat(first) if first else None,
+            date.fromisoformat(last) if last else None,
+        )
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM-DD:YYYY-MM-DD, got {value!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--schedule", required=True, help="task schedule CSV")
+    parser.add_argument("--answers", help="answers JSON (tasks already in the store need none)")
+    parser.add_argument("--leave", help="leave days CSV")
+    parser.add_argument("--weeks", type=parse_week_range, default=(None, None), help="FIRST:LAST range of week start dates")
+    parser.add_argument("--out", required=True, help="directory for the .docx reports")
+    parser.add_argument("--workers", type=int, default=4, help="parallel LLM requests and render processes")
+    parser.add_argument("--progress", help="progress file (default: <out>/progress.json)")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="task history database")
+    parser.add_argument("--namespace", default=DEFAULT_NAMESPACE, help="task history namespace (user or cohort member)")
+    parser.add_argument("--anchor", help="grouping anchor date YYYY-MM-DD")
+    parser.add_argument("--training-mode", default="Online", choices=["Online", "Physical", "Hybrid"])
+    parser.add_argument("--designation", help="supervisor designation")
+    parser.add_argument("--signature", help="your signature image")
+    parser.add_argument("--supervisor-signature", help="supervisor signature image")
+    parser.add_argument("--template", default=TEMPLATE_PATH)
+    args = parser.parse_args()
+
+    load_dotenv()
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        parser.error("OPENAI_API_KEY is not set")
+
+    first_week, last_week = args.weeks
+    written = run_batch(
+        args.schedule,
+        TaskStore(args.db, namespace=args.namespace),
+        api_key,
+        args.out,
+        args.template,
+        answers_path=args.answers,
+        leave_path=args.leave,
+        first_week=first_week,
+        last_week=last_week,
+        grouping_anchor=args.anchor,
+        training_mode=args.training_mode,
+        supervisor_designation=args.designation,
+        your_signature_path=args.signature,
+        supervisor_signature_path=args.supervisor_signature,
+        workers=args.workers,
+        progress_path=args.progress or os.path.join(args.out, "progress.json"),
+    )
+    print(f"{len(written)} report(s) written to {args.out}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+import random
+from collections import defaultdict
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from utils.csv_parser import TaskDayIndex, WeeklyTaskGroups, get_weekly_task_groups
+
+
+def _reference_groups(df, grouping_anchor=None, exclude_weekends=True, leave_dates=()):
+    """The original week-by-week implementation (one DataFrame scan per week)."""
+    if grouping_anchor is None:
+        grouping_anchor = df['Start Date'].min().date()
+    first_monday = grouping_anchor - timedelta(days=grouping_anchor.weekday())
+    last_due_date = df["Due Date"].max().date()
+    last_sunday = last_due_date + timedelta(days=(6 - last_due_date.weekday()))
+
+    weeks = {}
+    current = first_monday
+    while current <= last_sunday:
+        week_start = current
+        week_end = week_start + timedelta(days=6)
+        week_df = df[(df['Start Date'].dt.date <= week_end) & (df['Due Date'].dt.date >= week_start)]
+        tasks = defaultdict(list)
+        for _, row in week_df.iterrows():
+            task_start = max(row['Start Date'].date(), week_start)
+            task_end = min(row['Due Date'].date(), week_end)
+            for i in range((task_end - task_start).days + 1):
+                day = task_start + timedelta(days=i)
+                if exclude_weekends and day.weekday() >= 5:
+                    continue
+                if day in leave_dates:
+                    continue
+                task_text = f"{row['Task Name']} ({row['Linked Entity']})" if pd.notna(row['Linked Entity']) else row['Task Name']
+                tasks[day].append(task_text)
+        label = f"{week_start.strftime('%Y-%m-%d')} to {week_end.strftime('%Y-%m-%d')}"
+        weeks[label] = {week_start + timedelta(days=i): tasks.get(week_start + timedelta(days=i), []) for i in range(5)}
+        current += timedelta(days=7)
+    return weeks
+
+
+def _random_schedule(rng, rows, start=date(2025, 1, 8), span_days=60):
+    starts = [pd.Timestamp(start + timedelta(days=rng.randrange(span_days))) for _ in range(rows)]
+    return pd.DataFrame({
+        "Task Name": [f"Task {rng.randrange(15)}" for _ in range(rows)],
+        "Start Date": starts,
+        "Due Date": [s + pd.Timedelta(days=rng.randrange(12)) for s in starts],
+        "Assignee": "Intern",
+        "Linked Entity": [rng.choice(["PROJ", "OPS", None]) for _ in range(rows)],
+    })
+
+
+def _random_leave(rng, count, start=date(2025, 1, 1), span_days=80):
+    return sorted({start + timedelta(days=rng.randrange(span_days)) for _ in range(count)})
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_weekly_groups_match_reference(seed):
+    rng = random.Random(seed)
+    df = _random_schedule(rng, rng.randrange(1, 60))
+    leave_dates = _random_leave(rng, rng.randrange(0, 8))
+    anchor = date(2024, 12, 20) + timedelta(days=rng.randrange(30)) if seed % 2 else None
+    assert get_weekly_task_groups(df, anchor, leave_dates=leave_dates) == _reference_groups(df, anchor, leave_dates=leave_dates)
+
+
+def test_weekends_kept_when_not_excluded():
+    rng = random.Random(0)
+    df = _random_schedule(rng, 30)
+    assert get_weekly_task_groups(df, exclude_weekends=False) == _reference_groups(df, exclude_weekends=False)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_incremental_update_matches_full_recompute(seed):
+    rng = random.Random(seed)
+    df = _random_schedule(rng, 50)
+    index = TaskDayIndex(df)
+    groups = WeeklyTaskGroups(index)
+    leave_dates = set()
+    for _ in range(10):
+        # Add and remove a few leave days and sometimes move the anchor, as the leave form does
+        for day in _random_leave(rng, rng.randrange(1, 4)):
+            leave_dates ^= {day}
+        anchor = date(2024, 12, 10) + timedelta(days=rng.randrange(40))
+        assert groups.update(anchor, leave_dates) == WeeklyTaskGroups(index).update(anchor, leave_dates)
+
+
+def test_update_recomputes_only_touched_weeks():
+    df = _random_schedule(random.Random(1), 40)
+    groups = WeeklyTaskGroups(TaskDayIndex(df))
+    anchor = date(2025, 1, 6)
+    weeks = groups.update(anchor)
+    assert groups.last_recomputed == len(weeks)
+    groups.update(anchor, [date(2025, 1, 14)])
+    assert groups.last_recomputed == 1
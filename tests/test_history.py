@@ -0,0 +1,93 @@
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from utils.history import MERGE_GAP_DAYS, SegmentIndex, compact_segments
+
+BASE = date(2025, 1, 6)
+
+
+def _day(offset):
+    return (BASE + timedelta(days=offset)).isoformat()
+
+
+def _random_segments(rng, count, span=40, descriptions="abc"):
+    segments = []
+    for _ in range(count):
+        start = rng.randrange(span)
+        end = start + rng.randrange(10)
+        segments.append({"start": _day(start), "end": _day(end), "description": rng.choice(descriptions)})
+    return segments
+
+
+def _day_map(segments):
+    """Naive reference: replay every segment day by day, newest wins."""
+    days = {}
+    for seg in segments:
+        day = date.fromisoformat(seg["start"])
+        while day.isoformat() <= seg["end"]:
+            days[day.isoformat()] = seg["description"]
+            day += timedelta(days=1)
+    return days
+
+
+def _naive_compact(segments, merge_gap_days=MERGE_GAP_DAYS):
+    compacted = []
+    for day, description in sorted(_day_map(segments).items()):
+        prev = compacted[-1] if compacted else None
+        gap = (date.fromisoformat(day) - date.fromisoformat(prev["end"])).days - 1 if prev else None
+        if prev and prev["description"] == description and gap <= merge_gap_days:
+            prev["end"] = day
+        else:
+            compacted.append({"start": day, "end": day, "description": description})
+    return compacted
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_compact_segments_matches_day_map(seed):
+    rng = random.Random(seed)
+    segments = _random_segments(rng, rng.randrange(1, 12))
+    assert compact_segments(segments) == _naive_compact(segments)
+
+
+def test_newer_segment_splits_older_one():
+    segments = [
+        {"start": _day(0), "end": _day(9), "description": "old"},
+        {"start": _day(3), "end": _day(4), "description": "new"},
+    ]
+    assert compact_segments(segments) == [
+        {"start": _day(0), "end": _day(2), "description": "old"},
+        {"start": _day(3), "end": _day(4), "description": "new"},
+        {"start": _day(5), "end": _day(9), "description": "old"},
+    ]
+
+
+def test_same_description_merges_across_weekend_only():
+    friday_to_monday = [
+        {"start": _day(0), "end": _day(4), "description": "a"},
+        {"start": _day(7), "end": _day(11), "description": "a"},
+    ]
+    assert compact_segments(friday_to_monday) == [{"start": _day(0), "end": _day(11), "description": "a"}]
+    three_day_gap = [
+        {"start": _day(0), "end": _day(4), "description": "a"},
+        {"start": _day(8), "end": _day(11), "description": "a"},
+    ]
+    assert len(compact_segments(three_day_gap)) == 2
+
+
+def test_reversed_segment_is_ignored():
+    assert compact_segments([{"start": _day(3), "end": _day(1), "description": "a"}]) == []
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_segment_index_lookups(seed):
+    rng = random.Random(seed)
+    segments = _random_segments(rng, 8)
+    index = SegmentIndex(segments)
+    for offset in range(-2, 52):
+        day = _day(offset)
+        expected = [seg for seg in index.segments if seg["start"] <= day <= seg["end"]]
+        assert index.find(day) == (expected[0] if expected else None)
+    start, end = _day(10), _day(20)
+    assert index.between(start, end) == [seg for seg in index.segments if seg["start"] <= end and seg["end"] >= start]
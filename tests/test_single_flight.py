@@ -0,0 +1,92 @@
+import threading
+import time
+
+import pytest
+
+from utils.single_flight import SingleFlight
+
+
+def _wait_until(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def _run_with_waiter(flight, fn):
+    """Starts a leader running fn, then a second caller for the same key while fn is blocked."""
+    release = threading.Event()
+    calls = []
+    outcomes = {}
+
+    def blocking():
+        calls.append(1)
+        release.wait(5)
+        return fn()
+
+    def caller(name):
+        try:
+            outcomes[name] = ("result", flight.do("key", blocking))
+        except Exception as exc:
+            outcomes[name] = ("error", exc)
+
+    leader = threading.Thread(target=caller, args=("leader",))
+    leader.start()
+    _wait_until(lambda: flight.metrics()["in_flight"] == 1)
+    waiter = threading.Thread(target=caller, args=("waiter",))
+    waiter.start()
+    _wait_until(lambda: flight.metrics()["calls"] == 2)
+    release.set()
+    leader.join(5)
+    waiter.join(5)
+    return calls, outcomes
+
+
+def test_waiter_shares_leader_result():
+    flight = SingleFlight(timeout=5)
+    calls, outcomes = _run_with_waiter(flight, lambda: "answer")
+    assert len(calls) == 1
+    assert outcomes == {"leader": ("result", "answer"), "waiter": ("result", "answer")}
+    metrics = flight.metrics()
+    assert (metrics["executed"], metrics["shared"], metrics["in_flight"]) == (1, 1, 0)
+
+
+def test_waiter_gets_leader_error():
+    flight = SingleFlight(timeout=5)
+    error = ValueError("boom")
+
+    def fail():
+        raise error
+
+    calls, outcomes = _run_with_waiter(flight, fail)
+    assert len(calls) == 1
+    assert outcomes == {"leader": ("error", error), "waiter": ("error", error)}
+    assert flight.metrics()["errors_shared"] == 1
+
+
+def test_abandoned_call_lets_waiter_run_itself():
+    flight = SingleFlight(timeout=5)
+    call, is_leader = flight.begin("key")
+    assert is_leader
+    waiter_call, waiter_is_leader = flight.begin("key")
+    assert waiter_call is call and not waiter_is_leader
+    flight.finish("key", call, abandoned=True)
+    assert flight.wait(call) == (False, None)
+    assert flight.metrics()["executed"] == 2
+
+
+def test_waiter_times_out():
+    flight = SingleFlight(timeout=0.01)
+    call, _ = flight.begin("key")
+    assert flight.wait(call) == (False, None)
+    assert flight.metrics()["timeouts"] == 1
+    flight.finish("key", call, result="late")
+
+
+def test_key_is_free_after_finish():
+    flight = SingleFlight()
+    assert flight.do("key", lambda: 1) == 1
+    assert flight.do("key", lambda: 2) == 2
+    with pytest.raises(KeyError):
+        flight.do("key", lambda: {}["missing"])
+    assert flight.metrics()["in_flight"] == 0
@@ -0,0 +1,126 @@
+import json
+import random
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import pytest
+
+from utils.task_store import DEFAULT_NAMESPACE, TaskStore
+
+OLD_SCHEMA = """
+CREATE TABLE tasks (id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE);
+CREATE TABLE history (
+    id INTEGER PRIMARY KEY, task_id INTEGER NOT NULL REFERENCES tasks(id),
+    start TEXT NOT NULL, end TEXT NOT NULL, description TEXT NOT NULL, desc_hash TEXT NOT NULL,
+    UNIQUE (task_id, start, end, desc_hash)
+);
+CREATE TABLE daywise (
+    task_id INTEGER NOT NULL REFERENCES tasks(id), day TEXT NOT NULL, description TEXT NOT NULL,
+    PRIMARY KEY (task_id, day)
+);
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+"""
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TaskStore(str(tmp_path / "tasks.sqlite3"), legacy_json_path=None)
+
+
+def _day(offset):
+    return (date(2025, 1, 6) + timedelta(days=offset)).isoformat()
+
+
+def test_store_created_before_namespaces_is_upgraded(tmp_path):
+    path = str(tmp_path / "tasks.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.executescript(OLD_SCHEMA)
+    conn.execute("INSERT INTO tasks (id, name) VALUES (1, 'Report')")
+    conn.execute(
+        "INSERT INTO history (task_id, start, end, description, desc_hash) VALUES (1, ?, ?, 'Wrote it', 'x')",
+        (_day(0), _day(4)),
+    )
+    conn.execute("INSERT INTO daywise (task_id, day, description) VALUES (1, ?, 'Drafted')", (_day(0),))
+    conn.commit()
+    conn.close()
+
+    store = TaskStore(path, legacy_json_path=None)
+    assert store.namespace == DEFAULT_NAMESPACE
+    assert store.get_history("Report") == [{"start": _day(0), "end": _day(4), "description": "Wrote it"}]
+    assert store.get_daywise("Report") == {_day(0): "Drafted"}
+    # The same task name is free in every other namespace
+    other = store.for_namespace("alice")
+    assert other.get_daywise("Report") == {}
+    other.set_daywise("Report", {_day(1): "Reviewed"})
+    assert store.get_daywise("Report") == {_day(0): "Drafted"}
+    assert store.namespaces() == ["alice", DEFAULT_NAMESPACE]
+    # Reopening an upgraded store leaves it as it is
+    assert TaskStore(path, legacy_json_path=None).for_namespace("alice").get_daywise("Report") == {_day(1): "Reviewed"}
+
+
+def test_legacy_json_is_migrated_once(tmp_path):
+    json_path = tmp_path / "task_descriptions.json"
+    json_path.write_text(json.dumps({
+        "Report": {
+            "history": [
+                {"start": _day(0), "end": _day(4), "description": "old"},
+                {"start": _day(2), "end": _day(3), "description": "new"},
+            ],
+            "daywise_descriptions": {_day(0): "Drafted"},
+        }
+    }))
+    path = str(tmp_path / "tasks.sqlite3")
+    store = TaskStore(path, legacy_json_path=str(json_path))
+    assert store.to_dict()["Report"]["history"] == [
+        {"start": _day(0), "end": _day(1), "description": "old"},
+        {"start": _day(2), "end": _day(3), "description": "new"},
+        {"start": _day(4), "end": _day(4), "description": "old"},
+    ]
+    store.set_daywise("Report", {_day(0): "Edited"})
+    # Later constructions must not import the file again over newer data
+    json_path.write_text("not json")
+    assert not TaskStore(path, legacy_json_path=str(json_path)).migrate_from_json(str(json_path))
+    assert store.get_daywise("Report") == {_day(0): "Edited"}
+    assert store.for_namespace("alice").to_dict() == {}
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_newest_segment_wins_on_every_written_day(store, seed):
+    rng = random.Random(seed)
+    expected = {}
+    for _ in range(15):
+        start = rng.randrange(30)
+        end = start + rng.randrange(7)
+        description = rng.choice("abc")
+        store.add_history_segment("Task", _day(start), _day(end), description)
+        for offset in range(start, end + 1):
+            expected[_day(offset)] = description
+    history = store.get_history("Task")
+    assert all(a["end"] < b["start"] for a, b in zip(history, history[1:]))
+    for day, description in expected.items():
+        assert [seg["description"] for seg in history if seg["start"] <= day <= seg["end"]] == [description]
+
+
+def test_unchanged_segment_is_not_rewritten(store):
+    assert store.add_history_segment("Task", _day(0), _day(4), "a")
+    assert not store.add_history_segment("Task", _day(1), _day(3), "a")
+    assert store.add_history_segment("Task", _day(1), _day(3), "b")
+
+
+def test_concurrent_sessions_lose_no_updates(tmp_path):
+    path = str(tmp_path / "tasks.sqlite3")
+    store = TaskStore(path, legacy_json_path=None)
+
+    def session(s):
+        view = store.for_namespace("shared")
+        for t in range(5):
+            task = f"Task {s}-{t}"
+            view.add_history_segment(task, _day(0), _day(4), f"{task} work")
+            view.set_daywise(task, {_day(d): f"{task} day {d}" for d in range(5)})
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(session, range(8)))
+    view = TaskStore(path, legacy_json_path=None).for_namespace("shared")
+    assert len(view.task_names()) == 40
+    assert all(len(view.get_daywise(task)) == 5 and len(view.get_history(task)) == 1 for task in view.task_names())
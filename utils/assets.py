@@ -0,0 +1,95 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+from PIL import Image, UnidentifiedImageError
+
+# Signatures are placed 1.2 inches wide; 300 dpi at that width is plenty for print
+SIGNATURE_WIDTH_INCHES = 1.2
+SIGNATURE_DPI = 300
+SIGNATURE_MAX_PX = int(SIGNATURE_WIDTH_INCHES * SIGNATURE_DPI)
+
+
+def prepare_signature(data, max_width=SIGNATURE_MAX_PX):
+    """
+    Downscales an image to at most max_width pixels wide and recompresses it as PNG.
+    Returns the original bytes if they are already smaller or cannot be decoded.
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.load()
+            if image.width > max_width:
+                height = max(1, round(image.height * max_width / image.width))
+                image = image.resize((max_width, height), Image.LANCZOS)
+            if image.mode not in ("RGB", "RGBA", "L", "LA", "P"):
+                image = image.convert("RGBA")
+            out = io.BytesIO()
+            image.save(out, format="PNG", optimize=True, dpi=(SIGNATURE_DPI, SIGNATURE_DPI))
+    except (UnidentifiedImageError, OSError, ValueError):
+        return data
+    prepared = out.getvalue()
+    return prepared if len(prepared) < len(data) else data
+
+
+class AssetCache:
+    """
+    Content-addressed store of prepared signature images, shared by all sessions.
+    put() hashes the uploaded bytes, prepares each distinct image once and returns the
+    prepared bytes for add_picture along with the hash. Entries remember which sessions use
+    them and are dropped when the last one releases them; max_entries bounds what abandoned
+    sessions leave behind.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._owners = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "prepared": 0, "evictions": 0}
+
+    def put(self, data, session_id=None):
+        """Returns (content_hash, prepared_bytes)."""
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            if digest in self._entries:
+                self._entries.move_to_end(digest)
+                self._stats["hits"] += 1
+                if session_id is not None:
+                    self._owners[digest].add(session_id)
+                return digest, self._entries[digest]
+        prepared = prepare_signature(data)
+        with self._lock:
+            if digest in self._entries:
+                prepared = self._entries[digest]
+            else:
+                self._entries[digest] = prepared
+                self._owners[digest] = set()
+                self._stats["prepared"] += 1
+            if session_id is not None:
+                self._owners[digest].add(session_id)
+            while len(self._entries) > self.max_entries:
+                old, _ = self._entries.popitem(last=False)
+                del self._owners[old]
+                self._stats["evictions"] += 1
+        return digest, prepared
+
+    def get(self, digest):
+        with self._lock:
+            return self._entries.get(digest)
+
+    def release(self, digest, session_id):
+        """Drops session_id's use of digest, evicting the entry if no session uses it any more."""
+        with self._lock:
+            owners = self._owners.get(digest)
+            if owners is None:
+                return
+            owners.discard(session_id)
+            if not owners:
+                del self._entries[digest]
+                del self._owners[digest]
+                self._stats["evictions"] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), bytes=sum(len(v) for v in self._entries.values()))
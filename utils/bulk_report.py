@@ -0,0 +1,205 @@
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from utils.docx_handler import fill_report_template
+from utils.instrumentation import traced
+
+DAYS_OF_WEEK = ["MONDAY", "TUESDAY", "WEDNESDAY", "THURSDAY", "FRIDAY", "SATURDAY", "SUNDAY"]
+
+# A report renders in a few milliseconds, so smaller batches are faster in-process than
+# shipped to worker processes
+RENDER_POOL_MIN_JOBS = int(os.getenv("RENDER_POOL_MIN_JOBS", "32"))
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def report_filename(week_label):
+    return f"Diary_{week_label.replace(' ', '').replace(':', '-')}.docx"
+
+
+def week_start_from_label(week_label):
+    return datetime.strptime(week_label.split(" to ")[0], "%Y-%m-%d").date()
+
+
+def build_daily_entries(week_start, week_tasks, daywise_by_task, leave_data):
+    """
+    week_tasks: {date: [task_text]} for one week, as returned by get_weekly_task_groups
+    daywise_by_task: {task_text: {"YYYY-MM-DD": daywise_text}}
+    leave_data: {date: reason}
+    Returns {"MONDAY": {"date": ..., "desc": ...}, ...} for fill_report_template
+    """
+    daily_entries = {}
+    for i, day_name in enumerate(DAYS_OF_WEEK):
+        d = week_start + timedelta(days=i)
+        date_str = d.strftime('%Y-%m-%d')
+        if d in leave_data:
+            desc = f"Leave taken — {leave_data.get(d, 'No reason provided')}"
+        else:
+            parts = []
+            for task in week_tasks.get(d, []):
+                partial = daywise_by_task.get(task, {}).get(date_str, "")
+                if partial:
+                    parts.append(f"{task}:\n{partial}")
+            desc = "\n\n".join(parts)
+        daily_entries[day_name] = {"date": date_str, "desc": desc}
+    return daily_entries
+
+
+def _asset_digest(asset):
+    """Content hash of an asset given as bytes or a file path."""
+    if not asset:
+        return None
+    if isinstance(asset, (bytes, bytearray)):
+        return hashlib.sha256(asset).hexdigest()
+    with open(asset, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def week_input_hash(job, asset_digests):
+    """Content hash of everything that ends up in one week's report."""
+    payload = {k: v for k, v in job.items() if not k.endswith("_path")}
+    payload["assets"] = asset_digests
+    blob = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _render_week(job):
+    # Runs in a worker process, so it only takes and returns picklable data
+    report = fill_report_template(
+        job["template_path"],
+        None,
+        week_ending=job["week_ending"],
+        training_mode=job["training_mode"],
+        daily_entries=job["daily_entries"],
+        details_notes=job["details_notes"],
+        your_signature_path=job["your_signature_path"],
+        supervisor_signature_path=job["supervisor_signature_path"],
+        supervisor_designation=job["supervisor_designation"],
+    )
+    return job["label"], report.getvalue()
+
+
+def plan_report_jobs(
+    weekly_tasks,
+    daywise_by_task,
+    leave_data,
+    template_path,
+    training_mode,
+    details_by_week=None,
+    your_signature_path=None,
+    supervisor_signature_path=None,
+    supervisor_designation=None,
+):
+    """
+    One render job per week in weekly_tasks, each tagged with the content hash of its inputs.
+    Signatures may be image bytes (e.g. from utils.assets) or file paths.
+    """
+    details_by_week = details_by_week or {}
+    asset_digests = [
+        _asset_digest(template_path),
+        _asset_digest(your_signature_path),
+        _asset_digest(supervisor_signature_path),
+    ]
+    jobs = []
+    for label in sorted(weekly_tasks):
+        week_start = week_start_from_label(label)
+        job = {
+            "label": label,
+            "template_path": template_path,
+            "week_ending": (week_start + timedelta(days=6)).strftime('%Y-%m-%d'),
+            "training_mode": training_mode,
+            "daily_entries": build_daily_entries(week_start, weekly_tasks[label], daywise_by_task, leave_data),
+            "details_notes": details_by_week.get(label, ""),
+            "your_signature_path": your_signature_path,
+            "supervisor_signature_path": supervisor_signature_path,
+            "supervisor_designation": supervisor_designation,
+        }
+        job["input_hash"] = week_input_hash(job, asset_digests)
+        jobs.append(job)
+    return jobs
+
+
+def _get_pool(workers):
+    """
+    Process pool kept for the life of the process and rebuilt only to grow. Workers are
+    spawned rather than forked, since the caller may be a multi-threaded server.
+    """
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers < workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+def render_reports(jobs, max_workers=None):
+    """
+    Yields (label, docx_bytes) as each job finishes. Batches of at least RENDER_POOL_MIN_JOBS
+    are spread over a shared process pool; smaller ones render in this process.
+    """
+    workers = max_workers or os.cpu_count() or 1
+    if len(jobs) < RENDER_POOL_MIN_JOBS or workers == 1:
+        for job in jobs:
+            yield _render_week(job)
+        return
+    futures = [_get_pool(workers).submit(_render_week, job) for job in jobs]
+    for future in as_completed(futures):
+        yield future.result()
+
+
+@traced("docx.bulk")
+def generate_all_weeks(
+    weekly_tasks,
+    daywise_by_task,
+    leave_data,
+    template_path,
+    training_mode,
+    details_by_week=None,
+    your_signature_path=None,
+    supervisor_signature_path=None,
+    supervisor_designation=None,
+    previous_builds=None,
+    max_workers=None,
+):
+    """
+    Renders a report for every week in weekly_tasks and packs them into one ZIP.
+    previous_builds: {label: (input_hash, docx_bytes)} from an earlier call; weeks whose
+    inputs hash the same are copied from it instead of being rendered again.
+    Returns (zip_bytes, builds, rendered_labels) where builds is the next previous_builds.
+    """
+    previous_builds = previous_builds or {}
+    jobs = []
+    builds = {}
+    for job in plan_report_jobs(
+        weekly_tasks, daywise_by_task, leave_data, template_path, training_mode, details_by_week,
+        your_signature_path, supervisor_signature_path, supervisor_designation,
+    ):
+        previous = previous_builds.get(job["label"])
+        if previous and previous[0] == job["input_hash"]:
+            builds[job["label"]] = previous
+        else:
+            builds[job["label"]] = (job["input_hash"], None)
+            jobs.append(job)
+
+    zip_buffer = io.BytesIO()
+    with zipfile.ZipFile(zip_buffer, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        # Unchanged weeks go in straight away; rendered ones are streamed in as they finish
+        for label, (_, docx_bytes) in builds.items():
+            if docx_bytes is not None:
+                archive.writestr(report_filename(label), docx_bytes)
+        for label, docx_bytes in render_reports(jobs, max_workers):
+            builds[label] = (builds[label][0], docx_bytes)
+            archive.writestr(report_filename(label), docx_bytes)
+
+    return zip_buffer.getvalue(), builds, [job["label"] for job in jobs]
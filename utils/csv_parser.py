@@ -1,10 +1,165 @@
+import csv
+import io
+
+import numpy as np
 import pandas as pd
-from collections import defaultdict
-from datetime import datetime, timedelta
+from pandas.api.types import union_categoricals
+from datetime import date, datetime, timedelta
+
+from utils.instrumentation import traced
 
 REQUIRED_COLUMNS = ['Task Name', 'Start Date', 'Due Date', 'Assignee', 'Linked Entity']
+DATE_COLUMNS = ['Start Date', 'Due Date']
+CATEGORICAL_COLUMNS = ['Task Name', 'Assignee', 'Linked Entity']
+
+# Tried in order; month-first comes before day-first to match pandas' own inference
+DATE_FORMATS = [
+    "%Y-%m-%d",
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y/%m/%d",
+    "%m/%d/%Y",
+    "%d/%m/%Y",
+    "%m/%d/%Y %H:%M",
+    "%d/%m/%Y %H:%M",
+    "%m-%d-%Y",
+    "%d-%m-%Y",
+    "%d %b %Y",
+    "%b %d, %Y",
+    "%B %d, %Y",
+]
+
+def _read_header(csv_file):
+    """Column names from the first line of a path or file-like object, leaving the file where it was."""
+    if hasattr(csv_file, "read"):
+        pos = csv_file.tell()
+        first_line = csv_file.readline()
+        csv_file.seek(pos)
+    else:
+        with open(csv_file, "rb") as f:
+            first_line = f.readline()
+    if isinstance(first_line, bytes):
+        first_line = first_line.decode("utf-8-sig")
+    return next(csv.reader(io.StringIO(first_line)), [])
+
+def _resolve_columns(header):
+    """Maps each required column to its raw (possibly padded) name in the file."""
+    raw_names = {col.strip(): col for col in header}
+    missing = [col for col in REQUIRED_COLUMNS if col not in raw_names]
+    if missing:
+        raise ValueError(f"Missing required columns: {', '.join(missing)}")
+    return {col: raw_names[col] for col in REQUIRED_COLUMNS}
+
+def detect_date_format(values, sample_size=200):
+    """
+    First entry of DATE_FORMATS that parses every value among the first sample_size that
+    any format parses, or None. Values no format understands (typos, "TBD") are ignored.
+    """
+    sample = pd.Series(values).head(sample_size).dropna().astype(str).str.strip()
+    sample = sample[sample != ""]
+    if sample.empty:
+        return None
+    parsed = {fmt: pd.to_datetime(sample, format=fmt, errors='coerce').notna() for fmt in DATE_FORMATS}
+    parseable = np.logical_or.reduce(list(parsed.values()))
+    if not parseable.any():
+        return None
+    for fmt in DATE_FORMATS:
+        if parsed[fmt][parseable].all():
+            return fmt
+    return None
+
+def _check_text_columns(df):
+    """
+    pyarrow hands back undecodable text as bytes instead of failing; raise the same
+    UnicodeDecodeError the C parser (and fast=False) would.
+    """
+    for col in CATEGORICAL_COLUMNS:
+        for value in df[col].cat.categories:
+            if isinstance(value, bytes):
+                value.decode("utf-8")
+
+def _date_formats(df, date_format=None):
+    return {col: date_format or detect_date_format(df[col]) for col in DATE_COLUMNS}
+
+def _clean_schedule(df, date_formats):
+    # Convert date columns to datetime with one known format instead of per-value inference
+    for col in DATE_COLUMNS:
+        df[col] = pd.to_datetime(df[col], format=date_formats[col], errors='coerce')
 
-def load_schedule(csv_file):
+    # Drop invalid rows (only copies if there is something to drop)
+    valid = df['Start Date'].notna() & df['Due Date'].notna()
+    if not valid.all():
+        df = df.loc[valid]
+    return df
+
+def iter_schedule_chunks(csv_file, chunksize=100_000, date_format=None):
+    """
+    Streams a schedule in chunks of at most chunksize rows, reading only REQUIRED_COLUMNS.
+    Each chunk is cleaned like load_schedule output but not sorted. Unless date_format is
+    given, the date format is detected once from the first chunk.
+    """
+    columns = _resolve_columns(_read_header(csv_file))
+    reader = pd.read_csv(
+        csv_file,
+        usecols=list(columns.values()),
+        dtype={columns[col]: "category" for col in CATEGORICAL_COLUMNS},
+        chunksize=chunksize,
+    )
+    date_formats = None
+    for chunk in reader:
+        chunk.columns = [col.strip() for col in chunk.columns]
+        if date_formats is None:
+            date_formats = _date_formats(chunk, date_format)
+        chunk = _clean_schedule(chunk, date_formats)
+        if len(chunk):
+            yield chunk
+
+def _concat_chunks(chunks):
+    if not chunks:
+        return pd.DataFrame({
+            col: pd.Series(dtype="datetime64[ns]" if col in DATE_COLUMNS else "category")
+            for col in REQUIRED_COLUMNS
+        })
+    # Categories differ from chunk to chunk; unify them so concat keeps the category dtype
+    combined = {}
+    for col in chunks[0].columns:
+        if col in CATEGORICAL_COLUMNS:
+            combined[col] = union_categoricals([chunk[col] for chunk in chunks])
+        else:
+            combined[col] = np.concatenate([chunk[col].to_numpy() for chunk in chunks])
+    return pd.DataFrame(combined)
+
+@traced("csv.parse")
+def load_schedule(csv_file, fast=True, date_format=None, chunksize=None):
+    """
+    Reads a schedule CSV into a DataFrame with parsed Start/Due dates, invalid dates dropped
+    and rows sorted by Start Date.
+    fast: read only REQUIRED_COLUMNS with the pyarrow engine, store Task Name, Assignee and
+          Linked Entity as categoricals and parse dates with a single detected (or given) format.
+          fast=False is the original read of every column with per-value date inference.
+    chunksize: stream the file in chunks of this many rows (bounded parser memory for huge files).
+    """
+    if not fast:
+        return _load_schedule_full(csv_file)
+
+    if chunksize:
+        df = _concat_chunks(list(iter_schedule_chunks(csv_file, chunksize, date_format)))
+    else:
+        columns = _resolve_columns(_read_header(csv_file))
+        df = pd.read_csv(
+            csv_file,
+            engine="pyarrow",
+            usecols=list(columns.values()),
+            dtype={columns[col]: "category" for col in CATEGORICAL_COLUMNS},
+        )
+        df.columns = [col.strip() for col in df.columns]
+        _check_text_columns(df)
+        df = _clean_schedule(df, _date_formats(df, date_format))
+
+    # Sort for readability
+    return df.sort_values(by='Start Date', ignore_index=True)
+
+def _load_schedule_full(csv_file):
     df = pd.read_csv(csv_file)
 
     # Clean and normalize columns
@@ -27,56 +182,134 @@ def load_schedule(csv_file):
 
     return df
 
-def get_weekly_task_groups(df, grouping_anchor=None, exclude_weekends=True, leave_dates=[]):
+def _task_texts(df):
+    """Display text for each row: 'Task Name (Linked Entity)', or just the name if unlinked."""
+    names = df['Task Name']
+    linked = names.astype(str) + " (" + df['Linked Entity'].astype(str) + ")"
+    return linked.where(df['Linked Entity'].notna(), names).to_numpy(dtype=object)
+
+def _expand_task_days(df, first_monday, last_sunday, exclude_weekends=True):
     """
-    Groups tasks by week, starting from the earliest Monday on or before grouping_anchor,
-    to the last Sunday after the latest due date. All weeks in range will be present, even if no tasks.
+    Expands every task's [Start Date, Due Date] interval into one entry per day in a single pass.
+    Returns (rows, days): parallel int arrays of row positions and day offsets from first_monday,
+    ordered by day and then by row, with weekends optionally removed.
     """
-    # -- New: grouping_anchor, so weeks always start from earliest of user-input or csv
-    if grouping_anchor is None:
-        grouping_anchor = df['Start Date'].min().date()
-    elif isinstance(grouping_anchor, pd.Timestamp):
-        grouping_anchor = grouping_anchor.date()
-
-    # Compute calendar range
-    first_monday = grouping_anchor - timedelta(days=grouping_anchor.weekday())
-    last_due_date = df["Due Date"].max().date()
-    last_sunday = last_due_date + timedelta(days=(6 - last_due_date.weekday()))
-
-    current = first_monday
-    end = last_sunday
-
-    weeks = {}
-
-    while current <= end:
-        week_start = current
-        week_end = week_start + timedelta(days=6)
-
-        mask = (df['Start Date'].dt.date <= week_end) & (df['Due Date'].dt.date >= week_start)
-        week_df = df[mask]
-
-        tasks = defaultdict(list)
-        for _, row in week_df.iterrows():
-            task_start = max(row['Start Date'].date(), week_start)
-            task_end = min(row['Due Date'].date(), week_end)
-            for i in range((task_end - task_start).days + 1):
-                day = task_start + timedelta(days=i)
-                if exclude_weekends and day.weekday() >= 5:
-                    continue
-                if day in leave_dates:
-                    continue
-                task_text = f"{row['Task Name']} ({row['Linked Entity']})" if pd.notna(row['Linked Entity']) else row['Task Name']
-                tasks[day].append(task_text)
-
-        # Always include Mon–Fri, even if no tasks
+    origin = np.datetime64(first_monday, 'D')
+    starts = (df['Start Date'].to_numpy(dtype='datetime64[D]') - origin).astype(np.int64)
+    dues = (df['Due Date'].to_numpy(dtype='datetime64[D]') - origin).astype(np.int64)
+    span = (last_sunday - first_monday).days
+
+    # Clip to the calendar range; tasks that fall entirely outside it get zero days
+    starts = np.maximum(starts, 0)
+    dues = np.minimum(dues, span)
+    lengths = np.clip(dues - starts + 1, 0, None)
+
+    rows = np.repeat(np.arange(len(df)), lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    days = starts[rows] + offsets
+
+    # first_monday is a Monday, so day % 7 is the weekday
+    if exclude_weekends:
+        keep = days % 7 < 5
+        rows, days = rows[keep], days[keep]
+
+    order = np.argsort(days, kind='stable')
+    return rows[order], days[order]
+
+def _as_date(value):
+    return value if type(value) is date else pd.Timestamp(value).date()
+
+class TaskDayIndex:
+    """
+    Task-to-day index over a schedule: every task interval is expanded once into a flat list of
+    task texts sorted by day, with a per-day offset table into it, so the tasks of any day are a
+    single list slice. It does not depend on the grouping anchor or leave dates, so it is built
+    once per schedule and reused whenever those change.
+    """
+
+    def __init__(self, df, exclude_weekends=True):
+        self.exclude_weekends = exclude_weekends
+        if df.empty:
+            self.first_monday = self.last_sunday = None
+            self._texts, self._bounds = [], [0]
+            return
+        first_start = df['Start Date'].min().date()
+        last_due = df['Due Date'].max().date()
+        self.first_monday = first_start - timedelta(days=first_start.weekday())
+        self.last_sunday = last_due + timedelta(days=6 - last_due.weekday())
+        rows, days = _expand_task_days(df, self.first_monday, self.last_sunday, exclude_weekends)
+        self._texts = _task_texts(df)[rows].tolist()
+        span = (self.last_sunday - self.first_monday).days + 1
+        self._bounds = np.searchsorted(days, np.arange(span + 1)).tolist()
+
+    def tasks_on(self, day):
+        """Task texts active on day, in schedule row order."""
+        if self.first_monday is None:
+            return []
+        offset = (day - self.first_monday).days
+        if offset < 0 or offset >= len(self._bounds) - 1:
+            return []
+        return self._texts[self._bounds[offset]:self._bounds[offset + 1]]
+
+    def week(self, week_start, leave_dates=frozenset()):
+        """{day: [task_text]} for Mon–Fri of the week starting week_start; leave days stay empty."""
         full_week = {}
         for i in range(5):
             day = week_start + timedelta(days=i)
-            full_week[day] = tasks.get(day, [])
+            full_week[day] = [] if day in leave_dates else self.tasks_on(day)
+        return full_week
 
-        label = f"{week_start.strftime('%Y-%m-%d')} to {week_end.strftime('%Y-%m-%d')}"
-        weeks[label] = full_week
+class WeeklyTaskGroups:
+    """
+    The get_weekly_task_groups result for one schedule, kept up to date incrementally:
+    update() with a new anchor or leave set recomputes only the weeks containing an added or
+    removed leave day, adds or drops weeks at the start when the anchor moves, and reuses
+    every other week as is.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.weeks = {}
+        self.leave_dates = frozenset()
+        self.last_recomputed = 0
+
+    def update(self, grouping_anchor=None, leave_dates=()):
+        index = self.index
+        if grouping_anchor is None:
+            grouping_anchor = index.first_monday
+        grouping_anchor = _as_date(grouping_anchor)
+        leave_dates = frozenset(_as_date(d) for d in leave_dates)
+        changed_weeks = {d - timedelta(days=d.weekday()) for d in leave_dates ^ self.leave_dates}
 
-        current += timedelta(days=7)
+        first_monday = grouping_anchor - timedelta(days=grouping_anchor.weekday())
+        num_weeks = 0
+        if index.last_sunday is not None:
+            num_weeks = max(0, ((index.last_sunday - first_monday).days + 1) // 7)
 
-    return weeks
+        weeks = {}
+        recomputed = 0
+        for w in range(num_weeks):
+            week_start = first_monday + timedelta(days=7 * w)
+            week_end = week_start + timedelta(days=6)
+            label = f"{week_start.strftime('%Y-%m-%d')} to {week_end.strftime('%Y-%m-%d')}"
+            full_week = self.weeks.get(label)
+            if full_week is None or week_start in changed_weeks:
+                full_week = index.week(week_start, leave_dates)
+                recomputed += 1
+            weeks[label] = full_week
+
+        self.weeks = weeks
+        self.leave_dates = leave_dates
+        self.last_recomputed = recomputed
+        return weeks
+
+@traced("grouping")
+def get_weekly_task_groups(df, grouping_anchor=None, exclude_weekends=True, leave_dates=[]):
+    """
+    Groups tasks by week, starting from the earliest Monday on or before grouping_anchor,
+    to the last Sunday after the latest due date. All weeks in range will be present, even if no tasks.
+    """
+    # -- New: grouping_anchor, so weeks always start from earliest of user-input or csv
+    if grouping_anchor is None:
+        grouping_anchor = df['Start Date'].min().date()
+    return WeeklyTaskGroups(TaskDayIndex(df, exclude_weekends)).update(grouping_anchor, leave_dates)
@@ -1,6 +1,183 @@
+import copy
+import io
+import os
+import threading
+import zipfile
+
 from docx import Document
+from docx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+from docx.opc.pkgwriter import _ContentTypesItem
+from docx.oxml.ns import qn
 from docx.shared import Inches
+from docx.table import _Cell
+
+from utils.instrumentation import traced
+
+DAY_ROW_NAMES = ["MONDAY", "TUESDAY", "WEDNESDAY", "THURSDAY", "FRIDAY", "SATURDAY", "SUNDAY"]
+SIGNATURE_WIDTH = Inches(1.2)
+
+
+class CompiledTemplate:
+    """
+    The report template parsed once, with the slots we fill remembered up front:
+    table 0 header cells (0,0) and (0,3), day rows 2-8, and table 1 cells
+    (1,0), (2,2), (5,0) and (5,1). Each render works on a copy of the parsed
+    document part and saves into memory, so the template file is never touched again.
+    """
+
+    def __init__(self, template_path):
+        self.template_path = template_path
+        self._document = Document(template_path)
+        diary_table = self._document.tables[0]
+        details_table = self._document.tables[1]
+        if len(diary_table.rows) < 2 + len(DAY_ROW_NAMES) or len(details_table.rows) < 6:
+            raise ValueError(f"Unexpected table layout in template: {template_path}")
+        orig_text = diary_table.cell(0,0).text
+        self.header_prefix = orig_text.split("\n")[0] if "\n" in orig_text else orig_text
+
+        # Only the main document part is ever modified; every other part (styles, theme,
+        # media, ...) is shared between renders by seeding the deepcopy memo with it
+        package = self._document.part.package
+        self._package = package
+        self._shared_parts = {
+            id(part): part for part in package.iter_parts() if part is not package.main_document_part
+        }
+
+        # Shared parts never change, so they are serialized and compressed once into a base
+        # ZIP; each render only appends the document part, its rels and the content types
+        base = io.BytesIO()
+        with zipfile.ZipFile(base, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr(PACKAGE_URI.rels_uri.membername, package.rels.xml)
+            for part in self._shared_parts.values():
+                archive.writestr(part.partname.membername, part.blob)
+                if len(part.rels):
+                    archive.writestr(part.partname.rels_uri.membername, part.rels.xml)
+        self._base_zip = base.getvalue()
+
+        # Slots are stored as positions in the document-order list of <w:tc> elements,
+        # so a copy can find them without python-docx rebuilding the table grid
+        tcs = list(self._document.element.body.iter(qn("w:tc")))
+        def slot(cell):
+            return tcs.index(cell._tc)
+        self.slots = {
+            "header": slot(diary_table.cell(0,0)),
+            "training_mode": slot(diary_table.cell(0,3)),
+            "days": [
+                (slot(diary_table.rows[i+2].cells[1]), slot(diary_table.rows[i+2].cells[2]))
+                for i in range(len(DAY_ROW_NAMES))
+            ],
+            "details_notes": slot(details_table.cell(1,0)),
+            "your_signature": slot(details_table.cell(2,2)),
+            "date": slot(details_table.cell(5,0)),
+            "supervisor": slot(details_table.cell(5,1)),
+        }
+
+    def render(
+        self,
+        week_ending,
+        training_mode,
+        daily_entries,
+        details_notes,
+        your_signature=None,
+        supervisor_signature=None,
+        supervisor_designation=None
+    ):
+        """
+        Fills a copy of the template and returns it as a BytesIO positioned at 0.
+        Signatures may be a file path, raw image bytes or a file-like object.
+        """
+        # Copy the package, not the Document wrapper: lxml elements ignore the deepcopy memo,
+        # so only the part's own element is guaranteed to be the one that gets saved
+        package = copy.deepcopy(self._package, dict(self._shared_parts))
+        doc = package.main_document_part.document
+        tcs = list(doc.element.body.iter(qn("w:tc")))
+        def cell(name):
+            return _Cell(tcs[self.slots[name]], doc)
+
+        # --- Table 0 ---
+        cell("header").text = f"{self.header_prefix}\nSunday: {week_ending}"
+        cell("training_mode").text = f"TRAINING MODE\n{training_mode}"
+
+        for day, (date_slot, desc_slot) in zip(DAY_ROW_NAMES, self.slots["days"]):
+            _Cell(tcs[date_slot], doc).text = daily_entries.get(day, {}).get("date", "")
+            _Cell(tcs[desc_slot], doc).text = daily_entries.get(day, {}).get("desc", "")
+
+        # --- Table 1 ---
+        cell("details_notes").text = details_notes
+
+        # Your signature at [2,2]
+        if your_signature:
+            signature_cell = cell("your_signature")
+            signature_cell.text = ""
+            run = signature_cell.paragraphs[0].add_run()
+            run.add_picture(_image_stream(your_signature), width=SIGNATURE_WIDTH)
+
+        # Supervisor signature and designation at [5,1]
+        sig_text = "DESIGNATION AND SIGNATURE"
+        if supervisor_designation:
+            sig_text += f"\n{supervisor_designation}"
+        supervisor_cell = cell("supervisor")
+        supervisor_cell.text = sig_text
+        if supervisor_signature:
+            run = supervisor_cell.add_paragraph().add_run()
+            run.add_picture(_image_stream(supervisor_signature), width=SIGNATURE_WIDTH)
+
+        # Week-ending date at [5,0]
+        cell("date").text = f"DATE: {week_ending}"
+
+        output = io.BytesIO(self._base_zip)
+        output.seek(0, io.SEEK_END)
+        parts = list(package.iter_parts())
+        with zipfile.ZipFile(output, "a", compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr(CONTENT_TYPES_URI.membername, _ContentTypesItem.from_parts(parts).blob)
+            for part in parts:
+                if id(part) in self._shared_parts:
+                    continue
+                archive.writestr(part.partname.membername, part.blob)
+                if len(part.rels):
+                    archive.writestr(part.partname.rels_uri.membername, part.rels.xml)
+        output.seek(0)
+        return output
+
+
+_compiled_templates = {}
+_image_bytes = {}
+_cache_lock = threading.Lock()
+
+
+def _file_key(path):
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+def get_compiled_template(template_path):
+    """Per-process CompiledTemplate for template_path, recompiled only if the file changes."""
+    key = _file_key(template_path)
+    compiled = _compiled_templates.get(key)
+    if compiled is None:
+        compiled = CompiledTemplate(template_path)
+        with _cache_lock:
+            _compiled_templates[key] = compiled
+    return compiled
+
+
+def _image_stream(image):
+    if isinstance(image, (bytes, bytearray)):
+        return io.BytesIO(image)
+    if hasattr(image, "read"):
+        image.seek(0)
+        return image
+    key = _file_key(image)
+    data = _image_bytes.get(key)
+    if data is None:
+        with open(image, "rb") as f:
+            data = f.read()
+        with _cache_lock:
+            _image_bytes[key] = data
+    return io.BytesIO(data)
+
 
+@traced("docx.render")
 def fill_report_template(
     template_path,
     output_path,
@@ -12,43 +189,24 @@ def fill_report_template(
     supervisor_signature_path=None,
     supervisor_designation=None
 ):
-    doc = Document(template_path)
-
-    # --- Table 0 ---
-    diary_table = doc.tables[0]
-    orig_text = diary_table.cell(0,0).text
-    prefix = orig_text.split("\n")[0] if "\n" in orig_text else orig_text
-    diary_table.cell(0,0).text = f"{prefix}\nSunday: {week_ending}"
-    diary_table.cell(0,3).text = f"TRAINING MODE\n{training_mode}"
-
-    days = ["MONDAY", "TUESDAY", "WEDNESDAY", "THURSDAY", "FRIDAY", "SATURDAY", "SUNDAY"]
-    for i, day in enumerate(days):
-        row = diary_table.rows[i+2]
-        row.cells[1].text = daily_entries.get(day, {}).get("date", "")
-        row.cells[2].text = daily_entries.get(day, {}).get("desc", "")
-
-    # --- Table 1 ---
-    details_table = doc.tables[1]
-    details_table.cell(1,0).text = details_notes
-
-    # Your signature at [2,2]
-    if your_signature_path:
-        details_table.cell(2,2).text = ""
-        paragraph = details_table.cell(2,2).paragraphs[0]
-        run = paragraph.add_run()
-        run.add_picture(your_signature_path, width=Inches(1.2))
-
-    # Supervisor signature and designation at [5,1]
-    sig_text = "DESIGNATION AND SIGNATURE"
-    if supervisor_designation:
-        sig_text += f"\n{supervisor_designation}"
-    details_table.cell(5,1).text = sig_text
-    if supervisor_signature_path:
-        paragraph = details_table.cell(5,1).add_paragraph()
-        run = paragraph.add_run()
-        run.add_picture(supervisor_signature_path, width=Inches(1.2))
-
-    # Week-ending date at [5,0]
-    details_table.cell(5,0).text = f"DATE: {week_ending}"
-
-    doc.save(output_path)
+    """
+    Renders the report from the compiled template and returns it as a BytesIO.
+    Signatures may be file paths, image bytes or file-like objects.
+    output_path may be a path or writable file object to also save to, or None to skip writing.
+    """
+    output = get_compiled_template(template_path).render(
+        week_ending=week_ending,
+        training_mode=training_mode,
+        daily_entries=daily_entries,
+        details_notes=details_notes,
+        your_signature=your_signature_path,
+        supervisor_signature=supervisor_signature_path,
+        supervisor_designation=supervisor_designation,
+    )
+    if output_path is not None:
+        if hasattr(output_path, "write"):
+            output_path.write(output.getvalue())
+        else:
+            with open(output_path, "wb") as f:
+                f.write(output.getvalue())
+    return output
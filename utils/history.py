@@ -0,0 +1,74 @@
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+
+# Same-description segments separated by at most this many days (a weekend) are merged
+MERGE_GAP_DAYS = 2
+
+
+def shift_day(day, days):
+    """'YYYY-MM-DD' moved by days."""
+    return (date.fromisoformat(day) + timedelta(days=days)).isoformat()
+
+
+def _gap_days(end, start):
+    return (date.fromisoformat(start) - date.fromisoformat(end)).days - 1
+
+
+def compact_segments(segments, merge_gap_days=MERGE_GAP_DAYS):
+    """
+    Folds history segments, given oldest first, into sorted non-overlapping segments.
+    A later segment replaces whatever earlier ones said about its days (older segments are
+    trimmed or dropped), and neighbouring segments with the same description are merged.
+    """
+    starts, ends, descriptions = [], [], []
+    for seg in segments:
+        start, end, description = seg["start"], seg["end"], seg["description"]
+        if end < start:
+            continue
+        # Segments are sorted and disjoint, so ends are sorted too: [i, j) are the overlapping ones
+        i = bisect_left(ends, start)
+        j = bisect_right(starts, end)
+        new_starts, new_ends, new_descriptions = [start], [end], [description]
+        if i < j and starts[i] < start:
+            new_starts.insert(0, starts[i])
+            new_ends.insert(0, shift_day(start, -1))
+            new_descriptions.insert(0, descriptions[i])
+        if i < j and ends[j - 1] > end:
+            new_starts.append(shift_day(end, 1))
+            new_ends.append(ends[j - 1])
+            new_descriptions.append(descriptions[j - 1])
+        starts[i:j], ends[i:j], descriptions[i:j] = new_starts, new_ends, new_descriptions
+
+    compacted = []
+    for start, end, description in zip(starts, ends, descriptions):
+        prev = compacted[-1] if compacted else None
+        if prev and prev["description"] == description and _gap_days(prev["end"], start) <= merge_gap_days:
+            prev["end"] = end
+        else:
+            compacted.append({"start": start, "end": end, "description": description})
+    return compacted
+
+
+class SegmentIndex:
+    """Compacted history of one task with binary-search lookups by day."""
+
+    def __init__(self, segments):
+        self.segments = compact_segments(segments)
+        self._starts = [seg["start"] for seg in self.segments]
+
+    def find(self, day):
+        """The segment covering day, or None."""
+        i = bisect_right(self._starts, day) - 1
+        if i >= 0 and day <= self.segments[i]["end"]:
+            return self.segments[i]
+        return None
+
+    def description_for(self, day):
+        seg = self.find(day)
+        return seg["description"] if seg else None
+
+    def between(self, start, end):
+        """Segments overlapping [start, end]."""
+        i = max(0, bisect_right(self._starts, start) - 1)
+        j = bisect_right(self._starts, end)
+        return [seg for seg in self.segments[i:j] if seg["end"] >= start]
@@ -0,0 +1,143 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from logging.handlers import RotatingFileHandler
+
+TRACE_ENABLED = os.getenv("DIARY_TRACE", "0") == "1"
+TRACE_PATH = os.getenv("DIARY_TRACE_PATH", os.path.join("traces", "trace.jsonl"))
+
+_NULL_CONTEXT = nullcontext()
+
+
+class Tracer:
+    """
+    Collects per-stage timings and per-LLM-call usage, keeps the most recent events in
+    memory and appends every event to a size-rotated JSONL file. While disabled, stage()
+    returns a shared no-op context and record_llm() returns at once.
+    """
+
+    def __init__(self, enabled=TRACE_ENABLED, path=TRACE_PATH, max_events=2000,
+                 max_bytes=5 * 1024 * 1024, backup_count=3):
+        self.enabled = enabled
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._events = deque(maxlen=max_events)
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._llm = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "cache_hits": 0, "shared": 0}
+        self._logger = None
+
+    def _file_logger(self):
+        if self._logger is not None or not self.path:
+            return self._logger
+        with self._lock:
+            if self._logger is not None:
+                return self._logger
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            logger = logging.getLogger(f"{__name__}.{id(self)}")
+            logger.propagate = False
+            logger.setLevel(logging.INFO)
+            handler = RotatingFileHandler(self.path, maxBytes=self.max_bytes, backupCount=self.backup_count)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            self._logger = logger
+            return logger
+
+    def _emit(self, event):
+        event["ts"] = time.time()
+        event["thread"] = threading.current_thread().name
+        self._events.append(event)
+        logger = self._file_logger()
+        if logger is not None:
+            logger.info(json.dumps(event, default=str))
+
+    def stage(self, name, **attrs):
+        """Context manager timing one run of a pipeline stage."""
+        if not self.enabled:
+            return _NULL_CONTEXT
+        return self._timed(name, attrs)
+
+    @contextmanager
+    def _timed(self, name, attrs):
+        t0 = time.perf_counter()
+        error = None
+        try:
+            yield
+        except BaseException as exc:
+            error = type(exc).__name__
+            raise
+        finally:
+            seconds = time.perf_counter() - t0
+            with self._lock:
+                stats = self._stages.setdefault(name, {"count": 0, "total_s": 0.0, "max_s": 0.0, "errors": 0})
+                stats["count"] += 1
+                stats["total_s"] += seconds
+                stats["max_s"] = max(stats["max_s"], seconds)
+                stats["errors"] += error is not None
+            self._emit({"type": "stage", "stage": name, "seconds": seconds, "error": error, **attrs})
+
+    def record_llm(self, name, model, seconds, usage=None, cache=None):
+        """One LLM call: latency, response.usage token counts and cache status (hit/miss/bypass/shared)."""
+        if not self.enabled:
+            return
+        tokens = {
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+            "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+            "total_tokens": getattr(usage, "total_tokens", 0) or 0,
+        }
+        with self._lock:
+            self._llm["calls"] += 1
+            self._llm["cache_hits"] += cache == "hit"
+            self._llm["shared"] += cache == "shared"
+            for key, value in tokens.items():
+                self._llm[key] += value
+        self._emit({"type": "llm", "call": name, "model": model, "seconds": seconds, "cache": cache, **tokens})
+
+    def stage_summary(self):
+        with self._lock:
+            return {
+                name: dict(stats, mean_s=stats["total_s"] / stats["count"] if stats["count"] else 0.0)
+                for name, stats in self._stages.items()
+            }
+
+    def llm_summary(self):
+        with self._lock:
+            return dict(self._llm)
+
+    def recent_events(self, limit=50):
+        return list(self._events)[-limit:]
+
+    def reset(self):
+        with self._lock:
+            self._events.clear()
+            self._stages.clear()
+            for key in self._llm:
+                self._llm[key] = 0
+
+
+_tracer = Tracer()
+
+
+def get_tracer():
+    return _tracer
+
+
+def traced(name):
+    """Decorator timing every call of the wrapped function as stage `name` when tracing is on."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _tracer.enabled:
+                return fn(*args, **kwargs)
+            with _tracer.stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,195 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".llm_cache.sqlite3")
+
+
+class LLMCache:
+    """
+    Two-tier cache for chat completions: an in-process LRU dict on top of an SQLite file.
+    Entries are keyed by a hash of the full request (model, messages, temperature,
+    max_tokens, ...) and expire max_age_seconds after they were created in both tiers.
+    The disk tier is trimmed by age and then by total size/entry count, least recently
+    used first.
+    """
+
+    def __init__(
+        self,
+        path=DEFAULT_CACHE_PATH,
+        memory_entries=256,
+        max_entries=10000,
+        max_bytes=64 * 1024 * 1024,
+        max_age_seconds=30 * 24 * 3600,
+        cache_sampled=False,
+        evict_every=100,
+        touch_batch=64,
+        touch_interval_seconds=30,
+    ):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.cache_sampled = cache_sampled
+        self.evict_every = evict_every
+        self.touch_batch = touch_batch
+        self.touch_interval_seconds = touch_interval_seconds
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes_since_evict = 0
+        # Memory hits are written back to the disk tier's access time in batches
+        self._touched = {}
+        self._last_touch_flush = time.time()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS completions ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS completions_accessed ON completions(accessed)")
+
+    @staticmethod
+    def make_key(params):
+        """Content hash of the request parameters (model, messages, temperature, max_tokens, ...)."""
+        blob = json.dumps(params, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def is_cacheable(self, temperature):
+        # Deterministic calls are always safe to reuse; sampled ones only on request
+        return temperature == 0 or self.cache_sampled
+
+    def get(self, key):
+        with self._lock:
+            now = time.time()
+            if key in self._memory:
+                value, created = self._memory[key]
+                if now - created <= self.max_age_seconds:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    self._touched[key] = now
+                    if len(self._touched) >= self.touch_batch or now - self._last_touch_flush >= self.touch_interval_seconds:
+                        self._flush_touches(now)
+                    return value
+                del self._memory[key]
+            row = self._conn.execute(
+                "SELECT value, created FROM completions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.max_age_seconds:
+                self._stats["misses"] += 1
+                return None
+            self._conn.execute("UPDATE completions SET accessed = ? WHERE key = ?", (now, key))
+            self._remember(key, row[0], row[1])
+            self._stats["disk_hits"] += 1
+            return row[0]
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO completions (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode("utf-8")), now, now),
+            )
+            self._remember(key, value, now)
+            self._stats["writes"] += 1
+            self._writes_since_evict += 1
+            if self._writes_since_evict >= self.evict_every:
+                self._evict(now)
+
+    def evict(self):
+        with self._lock:
+            self._evict(time.time())
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._touched.clear()
+            self._conn.execute("DELETE FROM completions")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            count, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions"
+            ).fetchone()
+        stats["hits"] = stats["memory_hits"] + stats["disk_hits"]
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["memory_entries"] = len(self._memory)
+        stats["disk_entries"] = count
+        stats["disk_bytes"] = size
+        return stats
+
+    def _remember(self, key, value, created):
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _flush_touches(self, now):
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE completions SET accessed = MAX(accessed, ?) WHERE key = ?",
+                [(accessed, key) for key, accessed in self._touched.items()],
+            )
+            self._touched.clear()
+        self._last_touch_flush = now
+
+    def _evict(self, now):
+        self._writes_since_evict = 0
+        # Pending memory hits count as accesses, so hot entries are not taken for cold ones
+        self._flush_touches(now)
+        removed = self._conn.execute(
+            "DELETE FROM completions WHERE created < ?", (now - self.max_age_seconds,)
+        ).rowcount
+        for key in [key for key, (_, created) in self._memory.items() if created < now - self.max_age_seconds]:
+            del self._memory[key]
+        count, size = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM completions"
+        ).fetchone()
+        if count > self.max_entries or size > self.max_bytes:
+            # Walk from least recently used until both limits are satisfied
+            for key, entry_size in self._conn.execute(
+                "SELECT key, size FROM completions ORDER BY accessed ASC"
+            ).fetchall():
+                if count <= self.max_entries and size <= self.max_bytes:
+                    break
+                count -= 1
+                size -= entry_size
+                self._conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+                self._memory.pop(key, None)
+                removed += 1
+        self._stats["evictions"] += removed
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide cache, configured from LLM_CACHE_* environment variables on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMCache(
+                    path=DEFAULT_CACHE_PATH,
+                    cache_sampled=os.getenv("LLM_CACHE_SAMPLED", "0") == "1",
+                )
+    return _cache
+
+
+def set_cache(cache):
+    """Replaces the process-wide cache (e.g. to change limits or point at another file)."""
+    global _cache
+    with _cache_lock:
+        _cache = cache
@@ -0,0 +1,204 @@
+import os
+import threading
+import time
+
+import httpx
+import openai
+from tenacity import (
+    Retrying,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_random_exponential,
+)
+
+DEFAULT_RPM = int(os.getenv("OPENAI_RPM", "3500"))
+DEFAULT_TPM = int(os.getenv("OPENAI_TPM", "90000"))
+DEFAULT_MAX_ATTEMPTS = int(os.getenv("OPENAI_MAX_ATTEMPTS", "6"))
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(api_key):
+    """
+    Process-wide OpenAI client per API key. Reusing one client keeps its HTTP connection
+    pool (and TLS sessions) alive between calls. Retries are left to the scheduler.
+    """
+    client = _clients.get(api_key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(api_key)
+            if client is None:
+                client = openai.OpenAI(
+                    api_key=api_key,
+                    max_retries=0,
+                    http_client=httpx.Client(
+                        limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+                        timeout=httpx.Timeout(60.0, connect=10.0),
+                    ),
+                )
+                _clients[api_key] = client
+    return client
+
+
+class TokenBucket:
+    """Refills continuously at rate_per_minute up to capacity; acquire() blocks until enough is available."""
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._available = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount=1):
+        """Takes amount from the bucket, sleeping as needed. Returns the seconds spent waiting."""
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._available = min(self.capacity, self._available + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._available >= amount:
+                    self._available -= amount
+                    return waited
+                delay = (amount - self._available) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+def _is_retryable(exc):
+    if isinstance(exc, (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    return isinstance(exc, openai.APIStatusError) and exc.status_code >= 500
+
+
+def _estimate_tokens(params):
+    # Rough prompt size (~4 chars per token) plus the completion budget
+    prompt_chars = sum(len(str(m.get("content", ""))) for m in params.get("messages", []))
+    return prompt_chars // 4 + params.get("max_tokens", 0)
+
+
+class RequestScheduler:
+    """
+    Runs chat completions under request- and token-per-minute budgets, retrying 429s,
+    timeouts, connection errors and 5xx responses with jittered exponential backoff.
+    A stream=True request stays in_flight until its stream has been read to the end, and
+    counts as failed if reading it raises.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute=DEFAULT_RPM,
+        tokens_per_minute=DEFAULT_TPM,
+        max_attempts=DEFAULT_MAX_ATTEMPTS,
+        backoff_multiplier=0.5,
+        backoff_max=30,
+    ):
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.max_attempts = max_attempts
+        self.backoff_multiplier = backoff_multiplier
+        self.backoff_max = backoff_max
+        self._lock = threading.Lock()
+        self._metrics = {
+            "queue_depth": 0,
+            "in_flight": 0,
+            "requests": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "server_errors": 0,
+            "throttle_wait_seconds": 0.0,
+        }
+
+    def _add(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                self._metrics[name] += delta
+
+    def metrics(self):
+        with self._lock:
+            return dict(self._metrics)
+
+    def _attempt(self, client, params):
+        self._add(queue_depth=1)
+        try:
+            waited = self.request_bucket.acquire(1)
+            waited += self.token_bucket.acquire(_estimate_tokens(params))
+        finally:
+            self._add(queue_depth=-1)
+        self._add(in_flight=1, requests=1, throttle_wait_seconds=waited)
+        streaming = False
+        try:
+            response = client.chat.completions.create(**params)
+            # An open stream stays in flight until _consume finishes reading it
+            streaming = bool(params.get("stream"))
+            return response
+        except openai.RateLimitError:
+            self._add(rate_limited=1)
+            raise
+        except openai.APIStatusError as exc:
+            if exc.status_code >= 500:
+                self._add(server_errors=1)
+            raise
+        finally:
+            if not streaming:
+                self._add(in_flight=-1)
+
+    def _consume(self, stream):
+        try:
+            yield from stream
+        except Exception:
+            self._add(failed=1)
+            raise
+        else:
+            self._add(succeeded=1)
+        finally:
+            # Also reached when the consumer stops early; release the connection
+            stream.close()
+            self._add(in_flight=-1)
+
+    def create(self, client, **params):
+        """
+        client.chat.completions.create(**params), scheduled and retried. With stream=True the
+        chunks are returned as a generator; only opening the stream is retried.
+        """
+        retrying = Retrying(
+            retry=retry_if_exception(_is_retryable),
+            wait=wait_random_exponential(multiplier=self.backoff_multiplier, max=self.backoff_max),
+            stop=stop_after_attempt(self.max_attempts),
+            before_sleep=lambda state: self._add(retries=1),
+            reraise=True,
+        )
+        try:
+            response = retrying(self._attempt, client, params)
+        except Exception:
+            self._add(failed=1)
+            raise
+        if params.get("stream"):
+            return self._consume(response)
+        self._add(succeeded=1)
+        return response
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Process-wide scheduler, configured from OPENAI_RPM / OPENAI_TPM / OPENAI_MAX_ATTEMPTS."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = RequestScheduler()
+    return _scheduler
+
+
+def set_scheduler(scheduler):
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = scheduler
@@ -1,39 +1,141 @@
-import openai
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-def get_task_question(task_name, api_key):
-    client = openai.OpenAI(api_key=api_key)
+from utils.history import SegmentIndex
+from utils.instrumentation import get_tracer, traced
+from utils.llm_cache import get_cache
+from utils.openai_client import get_client, get_scheduler
+from utils.single_flight import get_single_flight
+
+def _chat_completion(client, call_name, **params):
+    """
+    Runs a chat completion and returns the message text, going through the shared
+    response cache when the call is cacheable (always for temperature 0). Identical
+    requests already in flight in this process wait for and share that request's result.
+    """
+    tracer = get_tracer()
+    t0 = time.perf_counter()
+    cache = get_cache()
+    key = cache.make_key(params)
+    cacheable = cache.is_cacheable(params.get("temperature"))
+    if cacheable:
+        cached = cache.get(key)
+        if cached is not None:
+            tracer.record_llm(call_name, params.get("model"), time.perf_counter() - t0, cache="hit")
+            return cached
+
+    executed = []
+
+    def create():
+        executed.append(True)
+        response = get_scheduler().create(client, **params)
+        content = response.choices[0].message.content
+        if cacheable and content is not None:
+            cache.set(key, content)
+        tracer.record_llm(
+            call_name, params.get("model"), time.perf_counter() - t0,
+            usage=getattr(response, "usage", None), cache="miss" if cacheable else "bypass",
+        )
+        return content
+
+    # Clients are pooled per API key, so the client id keeps different keys apart
+    content = get_single_flight().do((id(client), key), create)
+    if not executed:
+        tracer.record_llm(call_name, params.get("model"), time.perf_counter() - t0, cache="shared")
+    return content
+
+def _chat_completion_stream(client, call_name, **params):
+    """
+    Streaming counterpart of _chat_completion: yields text fragments as they arrive.
+    A cache hit, or the result of an identical stream already in flight, is yielded as a
+    single fragment; a finished stream is stored in the cache.
+    """
+    tracer = get_tracer()
+    t0 = time.perf_counter()
+    cache = get_cache()
+    key = cache.make_key(params)
+    cacheable = cache.is_cacheable(params.get("temperature"))
+    if cacheable:
+        cached = cache.get(key)
+        if cached is not None:
+            tracer.record_llm(call_name, params.get("model"), time.perf_counter() - t0, cache="hit")
+            yield cached
+            return
+
+    single_flight = get_single_flight()
+    flight_key = (id(client), key)
+    call, is_leader = single_flight.begin(flight_key)
+    if not is_leader:
+        shared, text = single_flight.wait(call)
+        if shared:
+            tracer.record_llm(call_name, params.get("model"), time.perf_counter() - t0, cache="shared")
+            yield text
+            return
+
+    fragments = []
+    usage = None
+    try:
+        stream = get_scheduler().create(
+            client, stream=True, stream_options={"include_usage": True}, **params
+        )
+        for chunk in stream:
+            # The final chunk carries usage and no choices
+            usage = getattr(chunk, "usage", None) or usage
+            if not chunk.choices:
+                continue
+            text = chunk.choices[0].delta.content
+            if text:
+                fragments.append(text)
+                yield text
+    except Exception as exc:
+        if is_leader:
+            single_flight.finish(flight_key, call, error=exc)
+        raise
+    except BaseException:
+        # Closed before the end (e.g. the page was left); waiters make their own request
+        if is_leader:
+            single_flight.finish(flight_key, call, abandoned=True)
+        raise
+    content = "".join(fragments)
+    if is_leader:
+        single_flight.finish(flight_key, call, result=content)
+    if cacheable:
+        cache.set(key, content)
+    tracer.record_llm(
+        call_name, params.get("model"), time.perf_counter() - t0,
+        usage=usage, cache="miss" if cacheable else "bypass",
+    )
+
+def _task_question_params(task_name):
     prompt = (
         f"You are helping an intern write a daily diary. "
         f"Generate a friendly, specific question to help the intern describe their work on the following task:\n"
         f"Task: {task_name}\n"
         "Make it conversational and encourage them to mention details, challenges, and learnings."
     )
-    response = client.chat.completions.create(
+    return dict(
         model="gpt-3.5-turbo",
         messages=[{"role": "system", "content": prompt}],
         max_tokens=60,
         temperature=0.7,
     )
-    return response.choices[0].message.content.strip()
 
-def refine_task_description(raw_text, api_key):
-    client = openai.OpenAI(api_key=api_key)
+def _refine_params(raw_text):
     prompt = (
         "Please correct the grammar and spelling of the following text. "
         "Do not change the style, add, or remove any content. "
         "Return only the fixed text.\n\n"
         f"Text:\n{raw_text}"
     )
-    response = client.chat.completions.create(
+    return dict(
         model="gpt-3.5-turbo",
         messages=[{"role": "system", "content": prompt}],
         max_tokens=400,
         temperature=0,
     )
-    return response.choices[0].message.content.strip()
 
-def get_notes_summary(all_entries, api_key):
-    client = openai.OpenAI(api_key=api_key)
+def _notes_summary_params(all_entries):
     prompt = (
         "Below are my rough diary notes for this week. "
         "Please combine them into a single, natural paragraph or two, written in the first person (as 'I'), "
@@ -42,29 +144,95 @@ def get_notes_summary(all_entries, api_key):
         f"{all_entries}\n\n"
         "My weekly notes:"
     )
-    response = client.chat.completions.create(
+    return dict(
         model="gpt-3.5-turbo",
         messages=[{"role": "system", "content": prompt}],
         max_tokens=250,
         temperature=0.7,
     )
-    return response.choices[0].message.content.strip()
 
-def get_daywise_partials(descs, all_days, api_key):
+def get_task_question(task_name, api_key):
+    return _chat_completion(get_client(api_key), "get_task_question", **_task_question_params(task_name)).strip()
+
+def refine_task_description(raw_text, api_key):
+    return _chat_completion(get_client(api_key), "refine_task_description", **_refine_params(raw_text)).strip()
+
+def get_notes_summary(all_entries, api_key):
+    return _chat_completion(get_client(api_key), "get_notes_summary", **_notes_summary_params(all_entries)).strip()
+
+def stream_task_question(task_name, api_key):
+    """Yields the question text as it is generated (for st.write_stream); strip the joined result."""
+    return _chat_completion_stream(get_client(api_key), "stream_task_question", **_task_question_params(task_name))
+
+def stream_refined_description(raw_text, api_key):
+    """Yields the refined text as it is generated (for st.write_stream); strip the joined result."""
+    return _chat_completion_stream(get_client(api_key), "stream_refined_description", **_refine_params(raw_text))
+
+def stream_notes_summary(all_entries, api_key):
+    """Yields the weekly summary as it is generated (for st.write_stream); strip the joined result."""
+    return _chat_completion_stream(get_client(api_key), "stream_notes_summary", **_notes_summary_params(all_entries))
+
+def _get_daywise_partials_batched(client, history, all_days):
+    N = len(all_days)
+    # Each distinct description is sent once, followed by the days it covers
+    groups = []
+    for i, day in enumerate(all_days):
+        desc = history.description_for(day)
+        if not groups or groups[-1][0] != desc:
+            groups.append((desc, []))
+        groups[-1][1].append(f"- {day} (day {i+1} of {N})")
+    day_lines = "\n".join(
+        f"Task description: '''{desc}'''\n" + "\n".join(lines) for desc, lines in groups
+    )
+    prompt = (
+        f"You are writing an internship work diary for a multi-day task. "
+        f"This task spans {N} days. The days, grouped under the task description that applies to them:\n"
+        f"{day_lines}\n"
+        "For every day, write only what would logically be accomplished on that particular day, "
+        "breaking down the task description into plausible progress for that day. "
+        "Do NOT repeat content between days, and do NOT include the date in the text. "
+        "Do NOT start with 'Summary for', 'On', or any date. "
+        "Be brief but specific—imagine you are spreading the workload evenly or logically across the days.\n"
+        "Respond with a JSON object whose keys are exactly the dates above (YYYY-MM-DD) "
+        "and whose values are the text for that day."
+    )
+    content = _chat_completion(
+        client,
+        "get_daywise_partials/batched",
+        model="gpt-3.5-turbo",
+        messages=[{"role": "system", "content": prompt}],
+        max_tokens=min(180 * N, 3000),
+        temperature=0.2,
+        response_format={"type": "json_object"},
+    )
+    try:
+        parsed = json.loads(content)
+    except (TypeError, ValueError):
+        return {}
+    if not isinstance(parsed, dict):
+        return {}
+    return {day: str(parsed[day]).strip() for day in all_days if parsed.get(day)}
+
+@traced("partials.task")
+def get_daywise_partials(descs, all_days, api_key, batched=False):
     """
-    descs: list of dicts [{"start": "YYYY-MM-DD", "end": "YYYY-MM-DD", "description": "..."}]
+    descs: list of dicts [{"start": "YYYY-MM-DD", "end": "YYYY-MM-DD", "description": "..."}],
+           oldest first; a later segment overrides earlier ones on the days they share
     all_days: list of date strings ("YYYY-MM-DD")
+    batched: ask for all days in a single JSON-mode request; days missing from the
+             reply fall back to one request each
     Returns {date: daywise_text}
     """
-    client = openai.OpenAI(api_key=api_key)
+    client = get_client(api_key)
+    history = SegmentIndex(descs)
     daywise_partials = {}
+    if batched and all_days:
+        daywise_partials.update(_get_daywise_partials_batched(client, history, all_days))
     N = len(all_days)
     for i, day in enumerate(all_days):
-        desc_for_day = None
-        for desc in descs:
-            if desc["start"] <= day <= desc["end"]:
-                desc_for_day = desc["description"]
-                break
+        if day in daywise_partials:
+            continue
+        desc_for_day = history.description_for(day)
         prompt = (
             f"You are writing an internship work diary for a multi-day task. "
             f"The overall task description is:\n'''{desc_for_day}'''\n"
@@ -76,12 +244,46 @@ def get_daywise_partials(descs, all_days, api_key):
             "Do NOT start with 'Summary for', 'On', or any date. "
             "Be brief but specific—imagine you are spreading the workload evenly or logically across the days."
         )
-        response = client.chat.completions.create(
+        content = _chat_completion(
+            client,
+            "get_daywise_partials/day",
             model="gpt-3.5-turbo",
             messages=[{"role": "system", "content": prompt}],
             max_tokens=180,
             temperature=0.2,
         )
-        daywise_partials[day] = response.choices[0].message.content.strip()
+        daywise_partials[day] = content.strip()
     return daywise_partials
 
+@traced("partials.week")
+def get_week_partials(task_requests, api_key, max_workers=8, batched=True, on_result=None):
+    """
+    Generates day-wise partials for several tasks concurrently on a thread pool.
+    task_requests: {task_name: (descs, days)} as taken by get_daywise_partials
+    max_workers: maximum number of tasks in flight at once
+    on_result: called as on_result(task_name, partials) on this thread as each task finishes
+    Returns {task_name: {date: daywise_text}}. If any task fails, the others still run to
+    completion (and reach on_result) before the first failure is re-raised.
+    """
+    if not task_requests:
+        return {}
+    results = {}
+    errors = []
+    workers = max(1, min(max_workers, len(task_requests)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(get_daywise_partials, descs, days, api_key, batched): task
+            for task, (descs, days) in task_requests.items()
+        }
+        for future in as_completed(futures):
+            try:
+                partials = future.result()
+            except Exception as exc:
+                errors.append(exc)
+                continue
+            results[futures[future]] = partials
+            if on_result is not None:
+                on_result(futures[future], partials)
+    if errors:
+        raise errors[0]
+    return results
@@ -0,0 +1,218 @@
+import csv
+import json
+import os
+from datetime import date, datetime, timedelta
+
+from utils.assets import prepare_signature
+from utils.bulk_report import plan_report_jobs, render_reports, report_filename, week_start_from_label
+from utils.csv_parser import get_weekly_task_groups, load_schedule
+from utils.instrumentation import traced
+from utils.openai_helper import get_week_partials
+
+
+def week_task_days(week_tasks, week_start, leave_dates=()):
+    """{task_text: ["YYYY-MM-DD", ...]} for the days of one week each task is worked on, leave excluded."""
+    if not isinstance(leave_dates, (set, frozenset, dict)):
+        leave_dates = frozenset(leave_dates)
+    unique_tasks = {}
+    for i in range(7):
+        day = week_start + timedelta(days=i)
+        if day in leave_dates:
+            continue
+        for task in week_tasks.get(day, []):
+            unique_tasks.setdefault(task, []).append(day.strftime('%Y-%m-%d'))
+    return unique_tasks
+
+
+def record_answers(task_store, unique_tasks, answers):
+    """
+    Saves each answered task's description as a history segment over its days this week
+    (only if the description or date range changed) and returns the partials still needed:
+    {task: (history, missing_days)}.
+    """
+    partial_requests = {}
+    for task, days in unique_tasks.items():
+        full_desc = answers.get(task, "")
+        if not full_desc:
+            continue
+        task_store.add_history_segment(task, days[0], days[-1], full_desc)
+        daywise = task_store.get_daywise(task)
+        missing_days = [d for d in days if d not in daywise]
+        if missing_days:
+            # Only the segments covering this week's days go to the model
+            partial_requests[task] = (task_store.get_history(task, missing_days[0], missing_days[-1]), missing_days)
+    return partial_requests
+
+
+@traced("pipeline.partials")
+def generate_partials(task_store, partial_requests, api_key, max_workers=8):
+    """
+    Runs get_week_partials over partial_requests and stores each task's results as soon as
+    they arrive, so a failed or interrupted run keeps (and a rerun skips) the finished ones.
+    Keys may be plain task names or (week_label, task) pairs.
+    """
+    if not partial_requests:
+        return {}
+
+    def save(key, partials):
+        task = key[1] if isinstance(key, tuple) else key
+        task_store.set_daywise(task, partials)
+
+    return get_week_partials(partial_requests, api_key, max_workers=max_workers, on_result=save)
+
+
+def select_weeks(week_labels, first=None, last=None):
+    """Labels whose week start falls within [first, last]; either bound may be None."""
+    selected = []
+    for label in sorted(week_labels):
+        week_start = week_start_from_label(label)
+        if first and week_start < first:
+            continue
+        if last and week_start > last:
+            continue
+        selected.append(label)
+    return selected
+
+
+def load_leave_file(path):
+    """
+    Reads leave days from a CSV of 'date,reason' rows (header optional, reason optional).
+    Returns {date: reason}.
+    """
+    leave_data = {}
+    if not path:
+        return leave_data
+    with open(path, newline="") as f:
+        for row in csv.reader(f):
+            if not row or not row[0].strip() or row[0].strip().lower() == "date":
+                continue
+            day = datetime.strptime(row[0].strip(), "%Y-%m-%d").date()
+            leave_data[day] = row[1].strip() if len(row) > 1 else ""
+    return leave_data
+
+
+def load_answers_file(path):
+    """
+    Reads a JSON answers file:
+        {"tasks": {task: answer}, "weeks": {week_label: {task: answer}}, "notes": {week_label: text}}
+    "tasks" answers apply to every week unless a week gives its own. A flat {task: answer}
+    object is read as "tasks". Returns (task_answers, week_answers, notes).
+    """
+    with open(path, "r") as f:
+        data = json.load(f)
+    if not any(key in data for key in ("tasks", "weeks", "notes")):
+        data = {"tasks": data}
+    return data.get("tasks", {}), data.get("weeks", {}), data.get("notes", {})
+
+
+def load_signature(path):
+    """Reads a signature image and shrinks it to the size it is rendered at; None without a path."""
+    if not path:
+        return None
+    with open(path, "rb") as f:
+        return prepare_signature(f.read())
+
+
+def _load_progress(path):
+    if path and os.path.exists(path):
+        with open(path, "r") as f:
+            return json.load(f)
+    return {"weeks": {}}
+
+
+def _save_progress(path, progress):
+    if not path:
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(progress, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def run_batch(
+    schedule_path,
+    task_store,
+    api_key,
+    output_dir,
+    template_path,
+    answers_path=None,
+    leave_path=None,
+    first_week=None,
+    last_week=None,
+    grouping_anchor=None,
+    training_mode="Online",
+    supervisor_designation=None,
+    your_signature_path=None,
+    supervisor_signature_path=None,
+    workers=4,
+    progress_path=None,
+    log=print,
+):
+    """
+    Headless version of the app flow for a range of weeks: group the schedule, record the
+    answers as task history, generate missing day-wise partials and write one report per week.
+    Day-wise partials persist in task_store and finished reports are tracked in progress_path
+    by input hash, so an interrupted run picks up where it stopped.
+    Returns the list of week labels whose report was (re)written.
+    """
+    df = load_schedule(schedule_path)
+    leave_data = load_leave_file(leave_path)
+    task_answers, week_answers, notes = load_answers_file(answers_path) if answers_path else ({}, {}, {})
+    if isinstance(grouping_anchor, str):
+        grouping_anchor = date.fromisoformat(grouping_anchor)
+    anchor = df['Start Date'].min().date()
+    if grouping_anchor:
+        anchor = min(anchor, grouping_anchor)
+
+    weekly_tasks = get_weekly_task_groups(df, grouping_anchor=anchor, leave_dates=list(leave_data))
+    labels = select_weeks(weekly_tasks, first_week, last_week)
+    log(f"{len(labels)} week(s) selected out of {len(weekly_tasks)}")
+
+    # History is recorded in week order; partials for every week are then generated together
+    partial_requests = {}
+    week_tasks_by_label = {}
+    for label in labels:
+        unique_tasks = week_task_days(weekly_tasks[label], week_start_from_label(label), leave_data)
+        week_tasks_by_label[label] = unique_tasks
+        answers = {**task_answers, **week_answers.get(label, {})}
+        for task, request in record_answers(task_store, unique_tasks, answers).items():
+            partial_requests[(label, task)] = request
+    if partial_requests:
+        log(f"Generating day-wise entries for {len(partial_requests)} task-week(s)")
+        generate_partials(task_store, partial_requests, api_key, max_workers=workers)
+
+    all_tasks = {task for unique_tasks in week_tasks_by_label.values() for task in unique_tasks}
+    daywise_by_task = {task: task_store.get_daywise(task) for task in all_tasks}
+    jobs = plan_report_jobs(
+        {label: weekly_tasks[label] for label in labels},
+        daywise_by_task,
+        leave_data,
+        template_path,
+        training_mode,
+        details_by_week=notes,
+        your_signature_path=load_signature(your_signature_path),
+        supervisor_signature_path=load_signature(supervisor_signature_path),
+        supervisor_designation=supervisor_designation,
+    )
+
+    os.makedirs(output_dir, exist_ok=True)
+    progress = _load_progress(progress_path)
+    pending = []
+    for job in jobs:
+        done = progress["weeks"].get(job["label"])
+        if done and done["input_hash"] == job["input_hash"] and os.path.exists(os.path.join(output_dir, done["file"])):
+            continue
+        pending.append(job)
+    log(f"{len(jobs) - len(pending)} report(s) up to date, {len(pending)} to render")
+
+    hashes = {job["label"]: job["input_hash"] for job in pending}
+    written = []
+    for label, docx_bytes in render_reports(pending, workers):
+        filename = report_filename(label)
+        with open(os.path.join(output_dir, filename), "wb") as f:
+            f.write(docx_bytes)
+        progress["weeks"][label] = {"input_hash": hashes[label], "file": filename}
+        _save_progress(progress_path, progress)
+        written.append(label)
+        log(f"Wrote {filename}")
+    return sorted(written)
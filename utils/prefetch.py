@@ -0,0 +1,117 @@
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor, wait
+
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "4"))
+# Jobs one Prefetcher may have queued or running at a time; more are submitted as those finish
+PREFETCH_PER_SESSION = int(os.getenv("PREFETCH_PER_SESSION", "2"))
+# How long wait_for blocks on a running job before the caller should do the work itself
+PREFETCH_WAIT_SECONDS = float(os.getenv("PREFETCH_WAIT_SECONDS", "5"))
+
+# Shared by every session so a crowd of users cannot spawn a pool each
+_executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+
+
+def _cancel_all(futures):
+    for future in list(futures.values()):
+        future.cancel()
+
+
+class Prefetcher:
+    """
+    Runs fn(key, *args) in the background for a batch of keys ahead of when they are needed.
+    Each batch belongs to a generation (e.g. the selected week); starting a new generation
+    cancels jobs from the old one that have not started and discards any that finish later.
+
+    At most max_jobs keys are submitted at once; the rest wait in a backlog that is only
+    topped up from prefetch() and pop_ready(), i.e. while the owner keeps calling in. An
+    abandoned session therefore spends at most max_jobs calls, and its queued jobs are
+    cancelled when the Prefetcher is garbage collected.
+    """
+
+    def __init__(self, fn, executor=None, max_jobs=PREFETCH_PER_SESSION):
+        self.fn = fn
+        self.executor = executor or _executor
+        self.max_jobs = max_jobs
+        self.generation = None
+        self._futures = {}
+        self._backlog = []
+        self._args = ()
+        self._lock = threading.Lock()
+        weakref.finalize(self, _cancel_all, self._futures)
+
+    def prefetch(self, generation, keys, *args):
+        """Queues fn for every key not already queued in this generation."""
+        with self._lock:
+            if generation != self.generation:
+                self._cancel_locked()
+                self.generation = generation
+            self._args = args
+            for key in keys:
+                if key not in self._futures and key not in self._backlog:
+                    self._backlog.append(key)
+            self._submit_locked()
+
+    def pop_ready(self, generation):
+        """Results that finished successfully for generation, removed from the pending set."""
+        ready = {}
+        with self._lock:
+            if generation != self.generation:
+                return ready
+            for key, future in list(self._futures.items()):
+                if future.done():
+                    del self._futures[key]
+                    if not future.cancelled() and future.exception() is None:
+                        ready[key] = future.result()
+            self._submit_locked()
+        return ready
+
+    def wait_for(self, generation, key, timeout=PREFETCH_WAIT_SECONDS):
+        """
+        Takes key over for the caller. A job that has not started is cancelled and None is
+        returned at once, so the caller can run fn itself without queueing behind other
+        sessions; a running job is waited on for at most timeout seconds. Returns its result,
+        or None if there was no job, it failed or it did not finish in time (its result is
+        then discarded).
+        """
+        with self._lock:
+            if generation != self.generation:
+                return None
+            if key in self._backlog:
+                self._backlog.remove(key)
+                return None
+            future = self._futures.get(key)
+            if future is None:
+                return None
+            if future.cancel():
+                del self._futures[key]
+                self._submit_locked()
+                return None
+        done, _ = wait([future], timeout=timeout)
+        with self._lock:
+            if self._futures.get(key) is future:
+                del self._futures[key]
+                self._submit_locked()
+        if not done or future.cancelled() or future.exception() is not None:
+            return None
+        return future.result()
+
+    def is_pending(self, generation, key):
+        with self._lock:
+            return generation == self.generation and (key in self._futures or key in self._backlog)
+
+    def cancel(self):
+        with self._lock:
+            self._cancel_locked()
+            self.generation = None
+
+    def _submit_locked(self):
+        while self._backlog and sum(not f.done() for f in self._futures.values()) < self.max_jobs:
+            key = self._backlog.pop(0)
+            self._futures[key] = self.executor.submit(self.fn, key, *self._args)
+
+    def _cancel_locked(self):
+        _cancel_all(self._futures)
+        self._futures.clear()
+        self._backlog.clear()
@@ -0,0 +1,102 @@
+import os
+import threading
+
+SINGLE_FLIGHT_TIMEOUT = float(os.getenv("SINGLE_FLIGHT_TIMEOUT", "60"))
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.abandoned = False
+
+
+class SingleFlight:
+    """
+    Process-wide coalescing of identical concurrent requests: the first caller for a key
+    (the leader) does the work while later callers with the same key wait on that key's
+    event and share its result or exception. A waiter that times out, or whose leader gives
+    up without a result, does the work itself.
+    """
+
+    def __init__(self, timeout=SINGLE_FLIGHT_TIMEOUT):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {"calls": 0, "executed": 0, "shared": 0, "timeouts": 0, "errors_shared": 0}
+
+    def begin(self, key):
+        """Returns (call, is_leader). A leader must pass the call to finish() exactly once."""
+        with self._lock:
+            self._stats["calls"] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                return call, False
+            call = self._calls[key] = _Call()
+            self._stats["executed"] += 1
+            return call, True
+
+    def finish(self, key, call, result=None, error=None, abandoned=False):
+        """Publishes the leader's outcome to every waiter and frees the key."""
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call.result, call.error, call.abandoned = result, error, abandoned
+        call.done.set()
+
+    def wait(self, call, timeout=None):
+        """
+        Waits for the leader. Returns (True, result) when the result can be shared, raises the
+        leader's exception, or returns (False, None) on timeout or an abandoned call, in which
+        case the caller makes the request itself.
+        """
+        finished = call.done.wait(self.timeout if timeout is None else timeout)
+        with self._lock:
+            if not finished or call.abandoned:
+                self._stats["timeouts"] += not finished
+                self._stats["executed"] += 1
+                return False, None
+            self._stats["shared"] += 1
+            self._stats["errors_shared"] += call.error is not None
+        if call.error is not None:
+            raise call.error
+        return True, call.result
+
+    def do(self, key, fn, *args, **kwargs):
+        """Runs fn(*args, **kwargs) once for all concurrent callers with the same key."""
+        call, is_leader = self.begin(key)
+        if not is_leader:
+            shared, result = self.wait(call)
+            if shared:
+                return result
+            return fn(*args, **kwargs)
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as exc:
+            self.finish(key, call, error=exc)
+            raise
+        except BaseException:
+            self.finish(key, call, abandoned=True)
+            raise
+        self.finish(key, call, result=result)
+        return result
+
+    def metrics(self):
+        """Counters plus in_flight keys; 'shared' is the number of calls saved."""
+        with self._lock:
+            return dict(self._stats, in_flight=len(self._calls))
+
+
+_single_flight = SingleFlight()
+
+
+def get_single_flight():
+    """Process-wide instance shared by every session, so identical requests coalesce across users."""
+    return _single_flight
+
+
+def set_single_flight(single_flight):
+    """Replaces the process-wide instance (e.g. to change the timeout)."""
+    global _single_flight
+    _single_flight = single_flight
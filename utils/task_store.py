@@ -0,0 +1,313 @@
+import copy
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from utils.history import MERGE_GAP_DAYS, compact_segments, shift_day
+
+DEFAULT_DB_PATH = os.getenv("TASK_DB_PATH", "task_descriptions.sqlite3")
+LEGACY_JSON_PATH = "task_descriptions.json"
+DEFAULT_NAMESPACE = "default"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    namespace TEXT NOT NULL DEFAULT 'default',
+    name TEXT NOT NULL,
+    UNIQUE (namespace, name)
+);
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    task_id INTEGER NOT NULL REFERENCES tasks(id),
+    start TEXT NOT NULL,
+    end TEXT NOT NULL,
+    description TEXT NOT NULL,
+    desc_hash TEXT NOT NULL,
+    UNIQUE (task_id, start, end, desc_hash)
+);
+CREATE INDEX IF NOT EXISTS history_by_hash ON history (task_id, desc_hash, start);
+CREATE TABLE IF NOT EXISTS daywise (
+    task_id INTEGER NOT NULL REFERENCES tasks(id),
+    day TEXT NOT NULL,
+    description TEXT NOT NULL,
+    PRIMARY KEY (task_id, day)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _desc_hash(description):
+    return hashlib.sha256(description.encode("utf-8")).hexdigest()
+
+
+class _Database:
+    """
+    One SQLite file shared by every namespace view: a connection per thread, so readers
+    never wait on each other and each write only holds the database lock for its own short
+    transaction, plus an in-process read cache that is dropped whenever any connection
+    (in this process or another) commits.
+    """
+
+    def __init__(self, path, cache_entries=4096):
+        self.path = path
+        self.cache_entries = cache_entries
+        self._local = threading.local()
+        self._cache = {}
+        self._cache_version = None
+        self._cache_lock = threading.Lock()
+        conn = self.conn()
+        self._upgrade_tasks_table(conn)
+        conn.executescript(SCHEMA)
+        # Never writes, so its data_version changes exactly when another connection commits
+        self._watcher = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, isolation_level=None, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    @staticmethod
+    def _upgrade_tasks_table(conn):
+        """Adds the namespace column to stores created before namespaces; old tasks go to 'default'."""
+        conn.execute("PRAGMA foreign_keys=OFF")
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(tasks)")]
+            if columns and "namespace" not in columns:
+                conn.execute(
+                    "CREATE TABLE tasks_new (id INTEGER PRIMARY KEY, namespace TEXT NOT NULL DEFAULT 'default', "
+                    "name TEXT NOT NULL, UNIQUE (namespace, name))"
+                )
+                conn.execute("INSERT INTO tasks_new (id, namespace, name) SELECT id, 'default', name FROM tasks")
+                conn.execute("DROP TABLE tasks")
+                conn.execute("ALTER TABLE tasks_new RENAME TO tasks")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.execute("PRAGMA foreign_keys=ON")
+
+    @contextmanager
+    def write(self):
+        """A BEGIN IMMEDIATE transaction on this thread's connection."""
+        conn = self.conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def cached(self, key, load):
+        with self._cache_lock:
+            version = self._watcher.execute("PRAGMA data_version").fetchone()[0]
+            if version != self._cache_version or len(self._cache) >= self.cache_entries:
+                self._cache.clear()
+                self._cache_version = version
+            if key in self._cache:
+                return self._cache[key]
+        value = load()
+        with self._cache_lock:
+            # Loaded after reading version, so it is at least as new as that version
+            if self._cache_version == version:
+                self._cache[key] = value
+        return value
+
+
+class TaskStore:
+    """
+    SQLite-backed store for task history segments and day-wise descriptions.
+    Runs in WAL mode so readers never block the writer, and every write is a
+    small upsert of just the rows that changed. Each task's history is kept as
+    sorted, non-overlapping segments (see utils.history.compact_segments).
+    Tasks live in a namespace (one per user or schedule); for_namespace() gives
+    views that share this store's connections and read cache.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, legacy_json_path=LEGACY_JSON_PATH, namespace=DEFAULT_NAMESPACE):
+        self.path = path
+        self.namespace = namespace
+        self._db = _Database(path)
+        self._compact_all_history()
+        if legacy_json_path:
+            self.for_namespace(DEFAULT_NAMESPACE).migrate_from_json(legacy_json_path)
+
+    def for_namespace(self, namespace):
+        """The same store seen from another namespace."""
+        view = copy.copy(self)
+        view.namespace = namespace
+        return view
+
+    def _task_id(self, conn, task_name, create=False):
+        row = conn.execute(
+            "SELECT id FROM tasks WHERE namespace = ? AND name = ?", (self.namespace, task_name)
+        ).fetchone()
+        if row is not None:
+            return row[0]
+        if not create:
+            return None
+        return conn.execute(
+            "INSERT INTO tasks (namespace, name) VALUES (?, ?)", (self.namespace, task_name)
+        ).lastrowid
+
+    def namespaces(self):
+        return [row[0] for row in self._db.conn().execute("SELECT DISTINCT namespace FROM tasks ORDER BY namespace")]
+
+    def task_names(self):
+        rows = self._db.conn().execute("SELECT name FROM tasks WHERE namespace = ? ORDER BY id", (self.namespace,))
+        return [row[0] for row in rows]
+
+    def get_history(self, task_name, start=None, end=None):
+        """
+        History segments ordered by start date: [{"start", "end", "description"}].
+        With start/end, only the segments overlapping that date range.
+        """
+        query = (
+            "SELECT h.start, h.end, h.description FROM history h "
+            "JOIN tasks t ON t.id = h.task_id WHERE t.namespace = ? AND t.name = ?"
+        )
+        params = [self.namespace, task_name]
+        if end is not None:
+            query += " AND h.start <= ?"
+            params.append(end)
+        if start is not None:
+            query += " AND h.end >= ?"
+            params.append(start)
+        rows = self._db.conn().execute(query + " ORDER BY h.start", params).fetchall()
+        return [{"start": start, "end": end, "description": desc} for start, end, desc in rows]
+
+    @staticmethod
+    def _replace_history(conn, task_id, old_ids, segments):
+        conn.executemany("DELETE FROM history WHERE id = ?", [(row_id,) for row_id in old_ids])
+        conn.executemany(
+            "INSERT INTO history (task_id, start, end, description, desc_hash) VALUES (?, ?, ?, ?, ?)",
+            [
+                (task_id, seg["start"], seg["end"], seg["description"], _desc_hash(seg["description"]))
+                for seg in segments
+            ],
+        )
+
+    @staticmethod
+    def _is_covered(conn, task_id, desc_hash, start_date, end_date):
+        if task_id is None:
+            return False
+        return conn.execute(
+            "SELECT 1 FROM history WHERE task_id = ? AND desc_hash = ? AND start <= ? AND end >= ?",
+            (task_id, desc_hash, start_date, end_date),
+        ).fetchone() is not None
+
+    def add_history_segment(self, task_name, start_date, end_date, description):
+        """
+        Records description for [start_date, end_date], replacing what older segments said
+        about those days. A no-op if a segment with the same description already covers the
+        range. Returns True if the history changed.
+        """
+        desc_hash = _desc_hash(description)
+        # Reruns mostly re-save unchanged answers; check that on a plain read before taking the write lock
+        conn = self._db.conn()
+        if self._is_covered(conn, self._task_id(conn, task_name), desc_hash, start_date, end_date):
+            return False
+        with self._db.write() as conn:
+            task_id = self._task_id(conn, task_name, create=True)
+            if self._is_covered(conn, task_id, desc_hash, start_date, end_date):
+                return False
+            # Only the overlapping segments and mergeable neighbours can change
+            rows = conn.execute(
+                "SELECT id, start, end, description FROM history "
+                "WHERE task_id = ? AND start <= ? AND end >= ? ORDER BY start",
+                (task_id, shift_day(end_date, MERGE_GAP_DAYS + 1), shift_day(start_date, -MERGE_GAP_DAYS - 1)),
+            ).fetchall()
+            segments = [{"start": start, "end": end, "description": desc} for _, start, end, desc in rows]
+            segments.append({"start": start_date, "end": end_date, "description": description})
+            self._replace_history(conn, task_id, [row[0] for row in rows], compact_segments(segments))
+        return True
+
+    def _compact_all_history(self):
+        """One-time rewrite of histories stored before segments were compacted."""
+        marker = "history_compacted:1"
+        with self._db.write() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = ?", (marker,)).fetchone():
+                return
+            task_ids = [row[0] for row in conn.execute("SELECT DISTINCT task_id FROM history")]
+            for task_id in task_ids:
+                rows = conn.execute(
+                    "SELECT id, start, end, description FROM history WHERE task_id = ? ORDER BY id",
+                    (task_id,),
+                ).fetchall()
+                segments = [{"start": start, "end": end, "description": desc} for _, start, end, desc in rows]
+                self._replace_history(conn, task_id, [row[0] for row in rows], compact_segments(segments))
+            conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (marker, "1"))
+
+    def get_daywise(self, task_name):
+        """{date: daywise_text} for one task."""
+        def load():
+            return dict(self._db.conn().execute(
+                "SELECT d.day, d.description FROM daywise d "
+                "JOIN tasks t ON t.id = d.task_id WHERE t.namespace = ? AND t.name = ? ORDER BY d.day",
+                (self.namespace, task_name),
+            ).fetchall())
+        return dict(self._db.cached(("daywise", self.namespace, task_name), load))
+
+    def set_daywise(self, task_name, partials):
+        """Upserts {date: daywise_text} for one task."""
+        if not partials:
+            return
+        with self._db.write() as conn:
+            task_id = self._task_id(conn, task_name, create=True)
+            conn.executemany(
+                "INSERT INTO daywise (task_id, day, description) VALUES (?, ?, ?) "
+                "ON CONFLICT (task_id, day) DO UPDATE SET description = excluded.description",
+                [(task_id, day, text) for day, text in partials.items()],
+            )
+
+    def to_dict(self):
+        """Exports this namespace in the legacy task_descriptions.json layout."""
+        return {
+            name: {"history": self.get_history(name), "daywise_descriptions": self.get_daywise(name)}
+            for name in self.task_names()
+        }
+
+    def migrate_from_json(self, json_path):
+        """One-time import of a legacy task_descriptions.json into this namespace; later calls are no-ops."""
+        marker = f"migrated:{os.path.abspath(json_path)}"
+        # Every TaskStore construction calls this; skip reading the file once it has been imported
+        if self._db.conn().execute("SELECT 1 FROM meta WHERE key = ?", (marker,)).fetchone():
+            return False
+        if not os.path.exists(json_path):
+            return False
+        with open(json_path, "r") as f:
+            data = json.load(f)
+        with self._db.write() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = ?", (marker,)).fetchone():
+                return False
+            for task_name, entry in data.items():
+                task_id = self._task_id(conn, task_name, create=True)
+                rows = conn.execute(
+                    "SELECT id, start, end, description FROM history WHERE task_id = ? ORDER BY start",
+                    (task_id,),
+                ).fetchall()
+                segments = [{"start": start, "end": end, "description": desc} for _, start, end, desc in rows]
+                segments.extend(entry.get("history", []))
+                self._replace_history(conn, task_id, [row[0] for row in rows], compact_segments(segments))
+                conn.executemany(
+                    "INSERT OR IGNORE INTO daywise (task_id, day, description) VALUES (?, ?, ?)",
+                    [(task_id, day, text) for day, text in entry.get("daywise_descriptions", {}).items()],
+                )
+            conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (marker, "1"))
+        return True